@@ -0,0 +1 @@
+"""Offline benchmarks for foton (see ``python -m benchmarks.run --help``)."""
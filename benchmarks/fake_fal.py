@@ -0,0 +1,351 @@
+"""Local stand-in for the fal queue, storage and CDN endpoints.
+
+:class:`FakeFalServer` serves the three endpoints over HTTP on localhost with
+configurable latency and payload sizes, and :class:`FakeFalClient` mirrors
+the parts of ``fal_client`` that :mod:`foton.nodes.ai` uses, talking to the
+server instead of fal. Result images are downloaded from the server's CDN
+by the nodes themselves, so the whole AI node I/O path is exercised.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image as PILImage
+
+
+@dataclass
+class FakeFalConfig:
+    """Behaviour of the fake backend.
+
+    Attributes:
+        queue_latency: Seconds a request spends queued and running
+        upload_latency: Extra seconds every storage upload takes
+        download_latency: Extra seconds every CDN download takes
+        image_size: (width, height) of the images results point to
+        log_lines: Log lines reported while a request is in progress
+        poll_interval: Seconds between status polls of the client
+    """
+
+    queue_latency: float = 0.05
+    upload_latency: float = 0.0
+    download_latency: float = 0.0
+    image_size: Tuple[int, int] = (512, 512)
+    log_lines: int = 3
+    poll_interval: float = 0.01
+
+
+def _noise_png(size: Tuple[int, int], seed: int = 0) -> bytes:
+    """Encode a noise image, which compresses about as badly as a photo."""
+    width, height = size
+    pixels = np.random.default_rng(seed).integers(
+        0, 256, (height, width, 3), dtype=np.uint8
+    )
+    buffer = BytesIO()
+    PILImage.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeFalServer:
+    """HTTP server emulating fal's queue, storage and CDN on localhost.
+
+    Use it as a context manager; it serves from a background thread.
+    """
+
+    def __init__(self, config: Optional[FakeFalConfig] = None) -> None:
+        self.config = config or FakeFalConfig()
+        self.files: Dict[str, bytes] = {"result": _noise_png(self.config.image_size)}
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self.counters = {
+            "uploads": 0,
+            "submitted": 0,
+            "cancelled": 0,
+            "downloads": 0,
+            "bytes_uploaded": 0,
+            "bytes_downloaded": 0,
+        }
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        port = self._httpd.server_address[1]
+        return f"http://127.0.0.1:{port}"
+
+    @property
+    def result_bytes(self) -> int:
+        """Size of the image every edit result points to."""
+        return len(self.files["result"])
+
+    def start(self) -> "FakeFalServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-fal", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeFalServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _count(self, **amounts: int) -> None:
+        with self._lock:
+            for key, amount in amounts.items():
+                self.counters[key] += amount
+
+    def _status(self, request_id: str) -> Dict[str, Any]:
+        request = self.requests[request_id]
+        elapsed = time.monotonic() - request["submitted"]
+        if request["cancelled"]:
+            return {"status": "CANCELLED", "logs": []}
+        if elapsed >= self.config.queue_latency:
+            return {"status": "COMPLETED", "logs": []}
+        # Report the log lines spread over the request's lifetime
+        lines = self.config.log_lines
+        shown = int(lines * elapsed / self.config.queue_latency) if lines else 0
+        logs = [{"message": f"step {i + 1}/{lines}"} for i in range(shown)]
+        return {"status": "IN_PROGRESS", "logs": logs}
+
+    def _result(self, request_id: str) -> Dict[str, Any]:
+        request = self.requests[request_id]
+        if request["application"].endswith("vision"):
+            prompt = request["arguments"].get("prompt", "")
+            return {"output": f"refined: {prompt[:64]}"}
+        return {"images": [{"url": f"{self.url}/cdn/result"}]}
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _send(
+                self,
+                payload: Any,
+                status: int = 200,
+                content_type: str = "application/json",
+            ) -> None:
+                body = (
+                    payload
+                    if isinstance(payload, bytes)
+                    else json.dumps(payload).encode()
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                body = self._body()
+                if self.path == "/storage/upload":
+                    time.sleep(server.config.upload_latency)
+                    file_id = f"upload-{next(server._ids)}"
+                    server.files[file_id] = body
+                    server._count(uploads=1, bytes_uploaded=len(body))
+                    self._send({"url": f"{server.url}/cdn/{file_id}"})
+                elif self.path.startswith("/queue/submit/"):
+                    request_id = f"req-{next(server._ids)}"
+                    server.requests[request_id] = {
+                        "application": self.path[len("/queue/submit/") :],
+                        "arguments": json.loads(body or b"{}"),
+                        "submitted": time.monotonic(),
+                        "cancelled": False,
+                    }
+                    server._count(submitted=1)
+                    self._send({"request_id": request_id})
+                else:
+                    self._send({"detail": "not found"}, 404)
+
+            def do_PUT(self) -> None:
+                self._body()
+                parts = self.path.strip("/").split("/")
+                if parts[:2] == ["queue", "requests"] and parts[-1] == "cancel":
+                    request = server.requests.get(parts[2])
+                    if request is None:
+                        self._send({"detail": "not found"}, 404)
+                        return
+                    request["cancelled"] = True
+                    server._count(cancelled=1)
+                    self._send({"status": "CANCELLATION_REQUESTED"})
+                else:
+                    self._send({"detail": "not found"}, 404)
+
+            def do_GET(self) -> None:
+                parts = self.path.strip("/").split("/")
+                if parts[0] == "cdn" and len(parts) == 2 and parts[1] in server.files:
+                    time.sleep(server.config.download_latency)
+                    data = server.files[parts[1]]
+                    server._count(downloads=1, bytes_downloaded=len(data))
+                    self._send(data, content_type="image/png")
+                elif parts[:2] == ["queue", "requests"] and len(parts) >= 3:
+                    if parts[2] not in server.requests:
+                        self._send({"detail": "not found"}, 404)
+                    elif parts[-1] == "status":
+                        self._send(server._status(parts[2]))
+                    else:
+                        self._send(server._result(parts[2]))
+                else:
+                    self._send({"detail": "not found"}, 404)
+
+        return Handler
+
+
+class InProgress:
+    """Status update of a running request (as ``fal_client.InProgress``)."""
+
+    def __init__(self, logs: List[Dict[str, Any]]) -> None:
+        self.logs = logs
+
+
+class FakeFalClient:
+    """Drop-in for the ``fal_client`` functions foton's AI nodes call."""
+
+    InProgress = InProgress
+
+    def __init__(self, server: FakeFalServer) -> None:
+        self.server = server
+
+    def _call(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        content_type: str = "application/json",
+    ) -> Dict[str, Any]:
+        request = urllib.request.Request(
+            self.server.url + path,
+            data=body,
+            method=method,
+            headers={"Content-Type": content_type},
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            result: Dict[str, Any] = json.loads(response.read())
+        return result
+
+    def upload_file(self, path: str) -> str:
+        with open(path, "rb") as f:
+            data = f.read()
+        url: str = self._call("POST", "/storage/upload", data, "image/png")["url"]
+        return url
+
+    async def upload_file_async(self, path: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.upload_file, path)
+
+    def submit(
+        self, application: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> "SyncRequestHandle":
+        body = json.dumps(arguments or {}).encode()
+        response = self._call("POST", f"/queue/submit/{application}", body)
+        return SyncRequestHandle(self, response["request_id"])
+
+    async def submit_async(
+        self, application: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> "AsyncRequestHandle":
+        loop = asyncio.get_running_loop()
+        handle = await loop.run_in_executor(None, self.submit, application, arguments)
+        return AsyncRequestHandle(handle)
+
+    def subscribe(
+        self,
+        application: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        with_logs: bool = False,
+        on_queue_update: Any = None,
+    ) -> Any:
+        handle = self.submit(application, arguments)
+        for update in handle.iter_events(with_logs=with_logs):
+            if on_queue_update is not None:
+                on_queue_update(update)
+        return handle.get()
+
+
+class SyncRequestHandle:
+    """Handle of a submitted request, polled over HTTP."""
+
+    def __init__(self, client: FakeFalClient, request_id: str) -> None:
+        self.client = client
+        self.request_id = request_id
+
+    def status(self) -> Dict[str, Any]:
+        return self.client._call("GET", f"/queue/requests/{self.request_id}/status")
+
+    def iter_events(self, with_logs: bool = False) -> Iterator[InProgress]:
+        while True:
+            status = self.status()
+            if status["status"] != "IN_PROGRESS":
+                return
+            yield InProgress(status["logs"] if with_logs else [])
+            time.sleep(self.client.server.config.poll_interval)
+
+    def get(self) -> Any:
+        for _ in self.iter_events():
+            pass
+        if self.status()["status"] == "CANCELLED":
+            raise RuntimeError(f"Request {self.request_id} was cancelled")
+        return self.client._call("GET", f"/queue/requests/{self.request_id}")
+
+    def cancel(self) -> None:
+        self.client._call("PUT", f"/queue/requests/{self.request_id}/cancel", b"")
+
+
+class AsyncRequestHandle:
+    """Async counterpart of :class:`SyncRequestHandle`."""
+
+    def __init__(self, handle: SyncRequestHandle) -> None:
+        self._handle = handle
+        self.request_id = handle.request_id
+
+    async def _run(self, fn: Any, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def iter_events(self, with_logs: bool = False) -> Any:
+        interval = self._handle.client.server.config.poll_interval
+        while True:
+            status = await self._run(self._handle.status)
+            if status["status"] != "IN_PROGRESS":
+                return
+            yield InProgress(status["logs"] if with_logs else [])
+            await asyncio.sleep(interval)
+
+    async def get(self) -> Any:
+        return await self._run(self._handle.get)
+
+    async def cancel(self) -> None:
+        await self._run(self._handle.cancel)
+
+
+@contextmanager
+def patched_fal(client: FakeFalClient) -> Iterator[FakeFalClient]:
+    """Point foton's AI nodes at ``client`` instead of ``fal_client``."""
+    from foton.nodes import ai
+
+    original = ai.fal_client
+    ai.fal_client = client  # type: ignore[assignment]
+    try:
+        yield client
+    finally:
+        ai.fal_client = original
@@ -0,0 +1,407 @@
+"""Offline benchmark suite for foton.
+
+Run from the repository root::
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --quick --only planning node_overhead
+
+Remote calls go to a local fake fal backend (see :mod:`benchmarks.fake_fal`),
+so no network access or fal credentials are needed. Results are written as
+JSON so runs of different versions can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image as PILImage
+
+try:
+    import fal_client  # noqa: F401
+except ImportError:
+    # The benchmarks never talk to fal; let foton.nodes.ai import without it
+    sys.modules["fal_client"] = types.ModuleType("fal_client")
+
+import foton
+from foton import Graph, Image
+from foton import nodes as N
+from foton.base import Node, NodeOutput
+from foton.graph import ExecutionResult
+from foton.plan import ExecutionPlan
+
+from .fake_fal import FakeFalClient, FakeFalConfig, FakeFalServer, patched_fal
+
+
+@dataclass
+class BenchConfig:
+    """Sizes and repetitions of a benchmark run."""
+
+    repeat: int = 5
+    graph_sizes: Tuple[int, ...] = (10, 100, 1000, 10000)
+    chain_lengths: Tuple[int, ...] = (10, 100, 1000)
+    image_sizes: Tuple[Tuple[int, int], ...] = ((512, 512), (2048, 2048))
+    items: int = 16
+    workers: int = 8
+    queue_latency: float = 0.05
+    result_size: Tuple[int, int] = (512, 512)
+    memory: bool = True
+
+
+QUICK = BenchConfig(
+    repeat=3,
+    graph_sizes=(10, 100, 1000),
+    chain_lengths=(10, 100),
+    image_sizes=((512, 512),),
+    items=4,
+    workers=4,
+)
+
+
+class Noop(Node):
+    """Node that passes its ``a`` input through, to isolate graph overhead."""
+
+    # Has no parameters, so its inputs alone determine the output
+    cacheable = True
+
+    def execute(self, **inputs: Any) -> NodeOutput:
+        return NodeOutput(data={"value": inputs.get("a", 0)})
+
+    async def aexecute(self, **inputs: Any) -> NodeOutput:
+        return self.execute(**inputs)
+
+
+def _timings(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Run ``fn`` ``repeat`` times and summarize its wall times in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+    }
+
+
+def _peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak memory traced while running ``fn`` once, in bytes."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _dag(size: int) -> Graph:
+    """A graph of ``size`` Noop nodes where node i reads nodes i-1 and i//2."""
+    graph = Graph()
+    for i in range(size):
+        graph.add(f"n{i}", Noop())
+    for i in range(1, size):
+        graph.wire(f"n{i - 1}.value -> n{i}.a")
+        if i // 2 != i - 1:
+            graph.wire(f"n{i // 2}.value -> n{i}.b")
+    return graph
+
+
+def bench_planning(config: BenchConfig) -> Dict[str, Any]:
+    """Plan compilation, fingerprinting and critical path versus graph size."""
+    results = []
+    for size in config.graph_sizes:
+        graph = _dag(size)
+        plan = ExecutionPlan.compile(graph.nodes, graph.wires)
+        costs = {name: 1.0 for name in plan.order}
+
+        def compile_plan() -> None:
+            ExecutionPlan.compile(graph.nodes, graph.wires)
+
+        entry: Dict[str, Any] = {
+            "nodes": size,
+            "wires": len(graph.wires),
+            "compile_s": _timings(compile_plan, config.repeat),
+            "fingerprint_s": _timings(lambda: graph._fingerprints(plan), config.repeat),
+            "critical_path_s": _timings(
+                lambda: plan.critical_path(costs), config.repeat
+            ),
+        }
+        if config.memory:
+            entry["compile_peak_bytes"] = _peak_memory(compile_plan)
+        results.append(entry)
+    return {"sizes": results}
+
+
+def bench_node_overhead(config: BenchConfig) -> Dict[str, Any]:
+    """Cost of executing (or reusing) a trivial node, per executor."""
+    runs: Dict[str, Callable[[Graph, bool], Any]] = {
+        "sequential": lambda g, cache: g.run(use_cache=cache),
+        "threads": lambda g, cache: g.run(
+            executor="threads", max_workers=config.workers, use_cache=cache
+        ),
+        "async": lambda g, cache: asyncio.run(g.arun(use_cache=cache)),
+    }
+    results = []
+    for length in config.chain_lengths:
+        graph = Graph()
+        for i in range(length):
+            graph.add(f"n{i}", Noop())
+            if i:
+                graph.wire(f"n{i - 1}.value -> n{i}.a")
+        for executor, run in runs.items():
+            graph.clear_cache()
+            uncached = _timings(lambda: run(graph, False), config.repeat)
+            run(graph, True)
+            cached = _timings(lambda: run(graph, True), config.repeat)
+            entry: Dict[str, Any] = {
+                "nodes": length,
+                "executor": executor,
+                "run_s": uncached,
+                "per_node_us": uncached["median"] / length * 1e6,
+                "cached_run_s": cached,
+                "cached_per_node_us": cached["median"] / length * 1e6,
+            }
+            if config.memory:
+                entry["peak_bytes"] = _peak_memory(lambda: run(graph, False))
+            results.append(entry)
+    return {"chains": results}
+
+
+def bench_image(config: BenchConfig) -> Dict[str, Any]:
+    """Conversions between Image, PIL and numpy, and PNG encoding."""
+    results = []
+    for width, height in config.image_sizes:
+        pixels = np.random.default_rng(0).integers(
+            0, 256, (height, width, 3), dtype=np.uint8
+        )
+        pil = PILImage.fromarray(pixels)
+        image = Image(pil)
+
+        def encode() -> None:
+            image.pil.save(BytesIO(), format="PNG")
+
+        ops: Dict[str, Callable[[], Any]] = {
+            "from_pil": lambda: Image(pil),
+            "from_numpy": lambda: Image(pixels),
+            "to_numpy": lambda: image.numpy,
+            "numpy_copy": image.numpy_copy,
+            "to_pil": lambda: image.pil,
+            "copy": image.copy,
+            "encode_png": encode,
+        }
+        entry: Dict[str, Any] = {"width": width, "height": height, "ops": {}}
+        for op, fn in ops.items():
+            entry["ops"][op] = _timings(fn, config.repeat)
+            if config.memory:
+                entry["ops"][op]["peak_bytes"] = _peak_memory(fn)
+        results.append(entry)
+    return {"sizes": results}
+
+
+def _pipeline(workdir: Path) -> Graph:
+    graph = Graph()
+    graph.add("load", N.Load())
+    graph.add("edit", N.Edit(prompt="make him an astronaut"))
+    graph.add("grade", N.ColorGrade(intensity=0.8))
+    graph.add("export", N.Export(path=workdir / "out.png"))
+    graph.wire("load.image -> edit.image")
+    graph.wire("edit.image -> grade.image")
+    graph.wire("grade.image -> export.image")
+    return graph
+
+
+def _node_walls(results: List[ExecutionResult]) -> Dict[str, float]:
+    """Mean wall time of every node across ``results``."""
+    walls: Dict[str, List[float]] = {}
+    for result in results:
+        if result.profile is None:
+            continue
+        for profile in result.profile:
+            walls.setdefault(profile.node, []).append(profile.wall)
+    return {node: statistics.mean(samples) for node, samples in walls.items()}
+
+
+def bench_end_to_end(config: BenchConfig) -> Dict[str, Any]:
+    """Throughput of load -> Edit -> grade -> export against the fake backend."""
+    fake = FakeFalConfig(
+        queue_latency=config.queue_latency, image_size=config.result_size
+    )
+    results: Dict[str, Any] = {"backend": asdict(fake), "modes": []}
+    with tempfile.TemporaryDirectory() as tmp, FakeFalServer(fake) as server:
+        workdir = Path(tmp)
+        paths = []
+        for i in range(config.items):
+            path = workdir / f"in{i}.png"
+            path.write_bytes(server.files["result"])
+            paths.append(path)
+        items = [
+            {"load.path": path, "export.path": workdir / "out" / path.name}
+            for path in paths
+        ]
+
+        def sequential() -> List[Any]:
+            graph = _pipeline(workdir)
+            outputs = []
+            for item in items:
+                for port, value in item.items():
+                    node_name, input_name = port.split(".")
+                    graph.nodes[node_name].set_input(input_name, value)
+                outputs.append(graph.run(use_cache=False))
+            return outputs
+
+        def batch() -> List[Any]:
+            graph = _pipeline(workdir)
+            batch_results = graph.run_batch(
+                items, max_workers=config.workers, use_cache=False
+            )
+            return [item.result for item in batch_results if item.ok]
+
+        def gathered() -> List[Any]:
+            async def run_all() -> List[Any]:
+                graphs = []
+                for item in items:
+                    graph = _pipeline(workdir)
+                    for port, value in item.items():
+                        node_name, input_name = port.split(".")
+                        graph.nodes[node_name].set_input(input_name, value)
+                    graphs.append(graph)
+                return await asyncio.gather(
+                    *(graph.arun(use_cache=False) for graph in graphs)
+                )
+
+            return asyncio.run(run_all())
+
+        modes = {"sequential": sequential, "batch": batch, "async": gathered}
+        with patched_fal(FakeFalClient(server)):
+            for mode, fn in modes.items():
+                started = time.perf_counter()
+                outputs = fn()
+                wall = time.perf_counter() - started
+                entry: Dict[str, Any] = {
+                    "mode": mode,
+                    "items": config.items,
+                    "completed": len(outputs),
+                    "wall_s": wall,
+                    "items_per_s": len(outputs) / wall if wall else None,
+                    "node_wall_s": _node_walls(outputs),
+                }
+                if config.memory:
+                    entry["peak_bytes"] = _peak_memory(fn)
+                results["modes"].append(entry)
+        results["server"] = dict(server.counters)
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[BenchConfig], Dict[str, Any]]] = {
+    "planning": bench_planning,
+    "node_overhead": bench_node_overhead,
+    "image": bench_image,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss() -> Optional[int]:
+    """Peak resident set size of the process in bytes, where available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run(config: BenchConfig, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the selected benchmarks and return the report."""
+    report: Dict[str, Any] = {
+        "foton_version": foton.__version__,
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "config": asdict(config),
+        "benchmarks": {},
+    }
+    for name in only or list(BENCHMARKS):
+        print(f"running {name}...", file=sys.stderr)
+        started = time.perf_counter()
+        result = BENCHMARKS[name](config)
+        result["duration_s"] = time.perf_counter() - started
+        report["benchmarks"][name] = result
+    report["max_rss_bytes"] = _max_rss()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run"
+    )
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--repeat", type=int, help="repetitions per measurement")
+    parser.add_argument("--items", type=int, help="end-to-end batch size")
+    parser.add_argument(
+        "--latency", type=float, help="fake fal queue latency in seconds"
+    )
+    parser.add_argument(
+        "--result-size",
+        type=int,
+        nargs=2,
+        metavar=("WIDTH", "HEIGHT"),
+        help="size of the images the fake backend returns",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the traced memory passes"
+    )
+    parser.add_argument("--output", type=Path, help="write JSON here, not stdout")
+    args = parser.parse_args(argv)
+
+    config = QUICK if args.quick else BenchConfig()
+    overrides: Dict[str, Any] = {}
+    if args.repeat is not None:
+        overrides["repeat"] = args.repeat
+    if args.items is not None:
+        overrides["items"] = args.items
+    if args.latency is not None:
+        overrides["queue_latency"] = args.latency
+    if args.result_size is not None:
+        overrides["result_size"] = tuple(args.result_size)
+    if args.no_memory:
+        overrides["memory"] = False
+    config = BenchConfig(**{**asdict(config), **overrides})
+
+    report = json.dumps(run(config, args.only), indent=2, default=str)
+    if args.output is not None:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
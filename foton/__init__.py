@@ -4,7 +4,40 @@ EditGraph: A LangChain-style library for building image generation and editing p
 
 from .graph import Graph
 from .image import Image
+from .cache import DiskCache
+from .cancel import CancelToken, RunCancelled
+from .events import (
+    Event,
+    NodeFinished,
+    NodeStarted,
+    QueueUpdate,
+    RefinementStep,
+    UploadDone,
+)
+from .policy import Policy
+from .spec import register_node
+from .stats import TimingStats
+from .tracing import InMemoryTracer, OpenTelemetryTracer, Tracer
 from . import nodes
 
 __version__ = "0.1.0"
-__all__ = ["Graph", "Image", "nodes"]
\ No newline at end of file
+__all__ = [
+    "Graph",
+    "Image",
+    "DiskCache",
+    "CancelToken",
+    "RunCancelled",
+    "Event",
+    "NodeStarted",
+    "NodeFinished",
+    "QueueUpdate",
+    "UploadDone",
+    "RefinementStep",
+    "Policy",
+    "TimingStats",
+    "register_node",
+    "Tracer",
+    "InMemoryTracer",
+    "OpenTelemetryTracer",
+    "nodes",
+]
\ No newline at end of file
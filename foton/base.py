@@ -1,9 +1,16 @@
 """Base classes for EditGraph."""
 
+import asyncio
+import contextvars
+import copy
+import functools
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 from dataclasses import dataclass, field
 
+if TYPE_CHECKING:
+    from .policy import Policy
+
 
 @dataclass
 class NodeOutput:
@@ -23,7 +30,31 @@ class NodeOutput:
 
 class Node(ABC):
     """Base class for all nodes in the EditGraph pipeline."""
+
+    #: Whether the graph may reuse this node's output when its fingerprint
+    #: is unchanged. Defaults to True only for classes that override
+    #: :meth:`params`, since the default fingerprints ``config`` alone and
+    #: misses parameters kept as attributes. Nodes with side effects (e.g.
+    #: writing files) opt out.
+    cacheable: bool = False
+
+    #: Whether the node does pure CPU work (e.g. NumPy on whole frames) and
+    #: may be run in a worker process when the graph has a process pool.
+    cpu_bound: bool = False
+
+    #: Whether the node is a per-pixel transform of its ``image`` input that
+    #: implements :meth:`apply_pixels`, so chains of such nodes can be fused.
+    pixelwise: bool = False
+
+    #: Retry, timeout and hedging settings (a :class:`foton.policy.Policy`),
+    #: usually set through ``Graph.add(..., policy=...)``.
+    policy: Optional["Policy"] = None
     
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "cacheable" not in cls.__dict__ and "params" in cls.__dict__:
+            cls.cacheable = True
+
     def __init__(self, name: Optional[str] = None, **kwargs: Any) -> None:
         self.name = name or self.__class__.__name__.lower()
         self.config = kwargs
@@ -32,6 +63,9 @@ class Node(ABC):
     @abstractmethod
     def execute(self, **inputs: Any) -> NodeOutput:
         """Execute the node with given inputs.
+
+        Long-running nodes should call :func:`foton.cancel.check_cancelled`
+        between units of work so cancelled runs stop early.
         
         Args:
             **inputs: Input data for the node
@@ -40,6 +74,68 @@ class Node(ABC):
             NodeOutput containing the results
         """
         pass
+
+    async def aexecute(self, **inputs: Any) -> NodeOutput:
+        """Execute the node asynchronously.
+
+        The default implementation runs :meth:`execute` in the event loop's
+        default thread pool. Nodes that do I/O should override this with a
+        native coroutine so they do not occupy a thread while waiting.
+
+        Args:
+            **inputs: Input data for the node
+
+        Returns:
+            NodeOutput containing the results
+        """
+        loop = asyncio.get_running_loop()
+        # Carry the run's context (e.g. its cancel token) into the thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            None, functools.partial(context.run, self.execute, **inputs)
+        )
+    
+    def apply_pixels(self, pixels: Any) -> Any:
+        """Transform float32 pixels in [0, 1] (pixel-wise nodes only).
+
+        Args:
+            pixels: ``(height, width, channels)`` float32 ndarray
+
+        Returns:
+            The transformed pixels, clipped to [0, 1]
+        """
+        raise NotImplementedError(f"{type(self).__name__} is not pixel-wise")
+
+    def pixel_metadata(self) -> Dict[str, Any]:
+        """Image metadata a pixel-wise node adds to its output image."""
+        return {}
+
+    def params(self) -> Dict[str, Any]:
+        """Return the configuration that determines this node's output.
+
+        Used to fingerprint the node for incremental execution. Subclasses
+        should include every constructor argument that affects the result;
+        overriding this also makes them :attr:`cacheable` by default.
+        """
+        return dict(self.config)
+
+    def spec_params(self) -> Dict[str, Any]:
+        """Return the constructor arguments that recreate this node.
+
+        Used by :meth:`foton.Graph.to_spec`. Subclasses should include every
+        constructor argument, as JSON-compatible values.
+        """
+        return dict(self.config)
+    
+    def clone(self) -> "Node":
+        """Return a shallow copy of the node with its own inputs dict.
+
+        Used to run the same node for several items concurrently; the clone
+        shares configuration with the original but not per-run inputs.
+        """
+        node = copy.copy(self)
+        node.inputs = dict(self.inputs)
+        return node
     
     def set_input(self, key: str, value: Any) -> None:
         """Set an input value for the node."""
@@ -0,0 +1,236 @@
+"""Batch execution of a graph over many inputs."""
+
+import heapq
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cancel import CancelToken
+from .graph import ExecutionResult, Graph, _RunState, default_workers
+from .process import create_process_pool
+
+
+@dataclass
+class BatchResult:
+    """Outcome of running the graph for one batch item."""
+
+    index: int
+    inputs: Any
+    result: Optional[ExecutionResult] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the item completed without error."""
+        return self.error is None
+
+
+class _BatchItem:
+    """A batch item in flight: its private graph fork and run state."""
+
+    def __init__(self, index: int, inputs: Any, state: _RunState) -> None:
+        self.index = index
+        self.inputs = inputs
+        self.state = state
+        self.running = 0
+        self.error: Optional[BaseException] = None
+
+    @property
+    def done(self) -> bool:
+        if self.running:
+            return False
+        return self.error is not None or len(self.state.order) == len(self.state.plan)
+
+    def to_result(self) -> BatchResult:
+        if self.error is not None:
+            return BatchResult(self.index, self.inputs, error=self.error)
+        return BatchResult(self.index, self.inputs, result=self.state.result())
+
+
+def bind_inputs(graph: Graph, item: Any, entry: Optional[str]) -> None:
+    """Set the inputs described by a batch item on ``graph``'s nodes.
+
+    Args:
+        graph: Graph (usually a fork) whose nodes receive the inputs
+        item: Mapping of ``"node.port"`` to value, or a single value
+        entry: Port receiving ``item`` when it is not a mapping
+
+    Raises:
+        ValueError: If a port is malformed or names an unknown node
+    """
+    if isinstance(item, dict):
+        bindings = item
+    elif entry is not None:
+        bindings = {entry: item}
+    else:
+        raise ValueError("Batch items must be mappings when no entry port is given")
+
+    for port, value in bindings.items():
+        if "." not in port:
+            raise ValueError(f"Entry port must be 'node.input': {port}")
+        node_name, input_name = port.split(".", 1)
+        node = graph.get_node(node_name)
+        if node is None:
+            raise ValueError(f"Entry port references unknown node '{node_name}'")
+        node.set_input(input_name, value)
+
+
+def run_batch(
+    graph: Graph,
+    inputs: Iterable[Any],
+    entry: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    use_cache: bool = True,
+    free_intermediates: bool = False,
+    keep: Optional[Iterable[str]] = None,
+    max_processes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancelToken] = None,
+) -> Iterator[BatchResult]:
+    """Push many inputs through ``graph`` with stage-level pipelining.
+
+    Every item runs on its own fork of the graph, and the nodes of all items
+    in flight share one thread pool. Ready nodes of earlier items are
+    dispatched first, so while item k is being edited remotely, item k+1 can
+    be loading and item k-1 exporting. Inputs are consumed lazily, with at
+    most ``max_in_flight`` items in progress at once. If the graph has
+    timing stats, an item's nodes are prioritized by their estimated
+    remaining path length.
+
+    A failing node fails only its own item: the item is yielded with its
+    ``error`` set, its other in-flight nodes are cancelled and the rest of
+    the batch continues.
+
+    Cancelling the batch (through ``cancel_token``, ``timeout`` or
+    :meth:`Graph.cancel`) stops admitting items; the items in flight are
+    yielded with a RunCancelled error and then RunCancelled is raised.
+    Closing the generator early cancels the items in flight.
+
+    Args:
+        graph: Graph to run
+        inputs: Items to process. Each item is either a mapping of
+            ``"node.port"`` to value or a single value bound to ``entry``
+        entry: Port that receives non-mapping items, e.g. ``"load.path"``
+        max_workers: Number of worker threads shared by all items
+        max_in_flight: Maximum number of items being processed at once.
+            Defaults to twice the number of workers.
+        use_cache: Reuse cached outputs of unchanged nodes
+        free_intermediates: Release intermediate outputs per item
+        keep: Nodes whose outputs survive ``free_intermediates``
+        max_processes: If set, ``cpu_bound`` nodes of all items run in a
+            shared pool of this many worker processes
+        timeout: Cancel the batch if it takes longer than this many seconds
+        cancel_token: Cancel the batch when this token is cancelled
+
+    Yields:
+        A BatchResult per item, in completion order
+    """
+    if not graph.nodes:
+        raise ValueError("Cannot run empty graph")
+
+    plan = graph._compile()
+    ranking = plan.order
+    if graph.stats is not None:
+        # Within an item, start the longest estimated remaining path first
+        remaining = plan.critical_path(
+            {name: graph.stats.estimate(graph.nodes[name]) for name in plan.order}
+        )
+        ranking = sorted(plan.order, key=lambda name: -remaining[name])
+    position = {name: i for i, name in enumerate(ranking)}
+    workers = max_workers or default_workers()
+    max_in_flight = max_in_flight or 2 * workers
+
+    source = iter(enumerate(inputs))
+    exhausted = False
+    items: Dict[int, _BatchItem] = {}
+    # (item index, position, node name): earlier items first
+    ready: List[Tuple[int, int, str]] = []
+    running: Dict[Future, Tuple[int, str]] = {}
+    process_pool = create_process_pool(max_processes) if max_processes else None
+
+    with graph._cancel_scope(cancel_token, timeout) as token, ThreadPoolExecutor(
+        max_workers=workers
+    ) as pool:
+        try:
+            while True:
+                # Admit new items while there is room
+                while not exhausted and len(items) < max_in_flight:
+                    if token.cancelled:
+                        exhausted = True
+                        break
+                    try:
+                        index, item_inputs = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    try:
+                        fork = graph._fork()
+                        bind_inputs(fork, item_inputs, entry)
+                        state = _RunState(
+                            fork,
+                            plan,
+                            use_cache,
+                            free_intermediates,
+                            keep,
+                            process_pool,
+                            CancelToken(parent=token),
+                        )
+                    except Exception as e:
+                        yield BatchResult(index, item_inputs, error=e)
+                        continue
+                    items[index] = _BatchItem(index, item_inputs, state)
+                    for node_name in state.initial():
+                        heapq.heappush(ready, (index, position[node_name], node_name))
+
+                # Keep the pool busy, but no busier, so priorities hold
+                while ready and len(running) < workers:
+                    index, _, node_name = heapq.heappop(ready)
+                    item = items[index]
+                    if item.error is not None:
+                        continue
+                    future = pool.submit(item.state.execute, node_name)
+                    running[future] = (index, node_name)
+                    item.running += 1
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                else:
+                    done = set()
+
+                for future in done:
+                    index, node_name = running.pop(future)
+                    item = items[index]
+                    item.running -= 1
+                    try:
+                        output = future.result()
+                    except Exception as e:
+                        if item.error is None:
+                            item.error = e
+                            # Stop the item's other in-flight nodes early
+                            item.state.token.cancel(f"Node '{node_name}' failed")
+                        continue
+                    if item.error is None:
+                        for dependent in item.state.complete(node_name, output):
+                            heapq.heappush(
+                                ready, (index, position[dependent], dependent)
+                            )
+
+                for index in [i for i, item in items.items() if item.done]:
+                    item = items.pop(index)
+                    item.state.token.close()
+                    yield item.to_result()
+
+                if exhausted and not items:
+                    break
+            token.raise_if_cancelled()
+        finally:
+            if items:
+                # Closed early or failed: stop what is still running
+                token.cancel("Batch closed")
+            for future in running:
+                future.cancel()
+            if process_pool is not None:
+                process_pool.shutdown(wait=False, cancel_futures=True)
+            if graph.stats is not None:
+                graph.stats.save()
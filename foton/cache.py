@@ -0,0 +1,285 @@
+"""Content-addressed fingerprints and caches for node outputs."""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path, PurePath
+from typing import Any, Dict, Iterator, Optional, Union
+
+import numpy as np
+from PIL import Image as PILImage
+
+from .base import Node, NodeOutput
+from .image import Image
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, PurePath):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} has no content-based encoding")
+
+
+def fingerprint_value(value: Any) -> Optional[str]:
+    """Return a stable content hash for an input value.
+
+    Images are hashed by mode, size and pixel data, numpy arrays by dtype,
+    shape and data, and other values by their JSON representation.
+
+    Returns:
+        The hash, or None for values that cannot be hashed by content (e.g.
+        arbitrary objects), whose consumers must not be cached
+    """
+    digest = hashlib.sha256()
+    if isinstance(value, Image):
+        digest.update(f"image:{value.mode}:{value.size}".encode())
+        digest.update(value.pixel_bytes())
+    elif isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return None
+        digest.update(f"ndarray:{value.dtype.str}:{value.shape}".encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, (bytes, bytearray)):
+        digest.update(b"bytes:")
+        digest.update(value)
+    else:
+        try:
+            encoded = json.dumps(value, sort_keys=True, default=_json_default)
+        except (TypeError, ValueError):
+            return None
+        digest.update(encoded.encode())
+    return digest.hexdigest()
+
+
+def fingerprint_node(node: Node, inputs: Dict[str, str]) -> str:
+    """Return the fingerprint of a node's output.
+
+    The fingerprint covers the node class, its :meth:`~foton.base.Node.params`
+    and the fingerprints of everything feeding its inputs, so it changes
+    whenever the node or anything upstream of it changes.
+
+    Args:
+        node: Node to fingerprint
+        inputs: Mapping of input name to the fingerprint of its value
+
+    Returns:
+        Hex digest identifying the node's output
+    """
+    payload = {
+        "class": f"{type(node).__module__}.{type(node).__qualname__}",
+        "params": node.params(),
+        "inputs": inputs,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CacheStore(ABC):
+    """Interface for persistent node output caches.
+
+    Stores are keyed by node fingerprint (see :func:`fingerprint_node`) and
+    consulted by :meth:`foton.Graph.run` before executing a cacheable node.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[NodeOutput]:
+        """Return the output stored under ``key``, or None on a miss."""
+        pass
+
+    @abstractmethod
+    def put(self, key: str, output: NodeOutput) -> None:
+        """Store ``output`` under ``key``."""
+        pass
+
+
+class DiskCache(CacheStore):
+    """Content-addressed node output cache in a local directory.
+
+    Every entry is a directory named after its key holding the images of
+    ``NodeOutput.data`` as PNG files and everything else pickled. A SQLite
+    index tracks entry sizes and last access times, and the least recently
+    used entries are evicted once the cache grows beyond ``max_bytes``.
+
+    Entries are written to a scratch directory and renamed into place, and
+    the index relies on SQLite locking, so several processes on one host can
+    share a cache directory safely. An entry left unindexed by a process that
+    died while storing it is indexed again the next time it is read or stored.
+    """
+
+    def __init__(
+        self, directory: Union[str, Path], max_bytes: int = 10 * 1024**3
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            directory: Directory holding the cache (created if missing)
+            max_bytes: Size cap after which least recently used entries
+                are evicted
+        """
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self._objects = self.directory / "objects"
+        self._scratch = self.directory / "tmp"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._scratch.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.directory / "index.sqlite"
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                "last_access REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the index, commit on success and always close it."""
+        db = sqlite3.connect(str(self._index_path), timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _entry_path(self, key: str) -> Path:
+        return self._objects / key[:2] / key
+
+    def _adopt(self, db: sqlite3.Connection, key: str, path: Path) -> None:
+        """Index an entry directory that has no row in the index."""
+        try:
+            size = sum(p.stat().st_size for p in path.iterdir())
+        except OSError:
+            # Evicted in the meantime
+            return
+        db.execute(
+            "INSERT OR IGNORE INTO entries (key, size, last_access) "
+            "VALUES (?, ?, ?)",
+            (key, size, time.time()),
+        )
+
+    def get(self, key: str) -> Optional[NodeOutput]:
+        path = self._entry_path(key)
+        try:
+            with open(path / "entry.pkl", "rb") as f:
+                entry = pickle.load(f)
+            data = dict(entry["data"])
+            for port, image_info in entry["images"].items():
+                with PILImage.open(path / image_info["file"]) as pil:
+                    pil.load()
+                data[port] = Image(pil, metadata=image_info["metadata"])
+        except (
+            OSError,
+            EOFError,
+            pickle.UnpicklingError,
+            AttributeError,
+            ImportError,
+            ValueError,
+        ):
+            # Missing, evicted by another process while we were reading, or
+            # stored by code whose classes no longer unpickle
+            return None
+
+        with self._connect() as db:
+            updated = db.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            if updated.rowcount == 0:
+                self._adopt(db, key, path)
+        return NodeOutput(data=data, metadata=entry["metadata"])
+
+    def put(self, key: str, output: NodeOutput) -> None:
+        path = self._entry_path(key)
+        if path.exists():
+            with self._connect() as db:
+                self._adopt(db, key, path)
+            return
+
+        scratch = Path(tempfile.mkdtemp(dir=self._scratch))
+        try:
+            entry: Dict[str, Any] = {
+                "data": {},
+                "images": {},
+                "metadata": output.metadata,
+            }
+            for index, (port, value) in enumerate(output.data.items()):
+                if isinstance(value, Image):
+                    filename = f"{index}.png"
+                    # Reuses the original PNG encoding when it is still valid
+                    value.save(scratch / filename)
+                    entry["images"][port] = {
+                        "file": filename,
+                        "metadata": value.metadata,
+                    }
+                else:
+                    entry["data"][port] = value
+            with open(scratch / "entry.pkl", "wb") as f:
+                pickle.dump(entry, f)
+
+            size = sum(p.stat().st_size for p in scratch.iterdir())
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Index and publish the entry in one transaction, so the row is
+            # only committed once the entry is in place
+            with self._connect() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO entries (key, size, last_access) "
+                    "VALUES (?, ?, ?)",
+                    (key, size, time.time()),
+                )
+                try:
+                    os.rename(scratch, path)
+                except OSError:
+                    # Another process stored the same key first
+                    db.rollback()
+                    return
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until under ``max_bytes``."""
+        with self._connect() as db:
+            (total,) = db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+            rows = db.execute(
+                "SELECT key, size FROM entries ORDER BY last_access"
+            ).fetchall()
+            evicted = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+            db.executemany(
+                "DELETE FROM entries WHERE key = ?", [(key,) for key in evicted]
+            )
+
+        for key in evicted:
+            shutil.rmtree(self._entry_path(key), ignore_errors=True)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._connect() as db:
+            keys = [row[0] for row in db.execute("SELECT key FROM entries")]
+            db.execute("DELETE FROM entries")
+        for key in keys:
+            shutil.rmtree(self._entry_path(key), ignore_errors=True)
+
+    def __len__(self) -> int:
+        with self._connect() as db:
+            (count,) = db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return int(count)
+
+    def __repr__(self) -> str:
+        return f"DiskCache(directory={str(self.directory)!r})"
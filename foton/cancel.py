@@ -0,0 +1,149 @@
+"""Cooperative cancellation of running graphs."""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+
+
+class RunCancelled(RuntimeError):
+    """Raised when a run is cancelled or its deadline passes."""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared by everything a run executes.
+
+    Executors check the token before starting each node, and nodes check it
+    at safe points (e.g. between ``IterativeRefinement`` steps) through
+    :func:`check_cancelled`. Callbacks registered with :meth:`on_cancel` let
+    blocking work, such as a queued fal request, be aborted from outside.
+
+    A token created with a ``parent`` is cancelled together with the parent,
+    but cancelling it leaves the parent untouched, so one failing run can
+    stop its own nodes without affecting its siblings.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        parent: Optional["CancelToken"] = None,
+    ) -> None:
+        """Initialize the token.
+
+        Args:
+            timeout: Seconds after which the token cancels itself
+            parent: Token whose cancellation propagates to this one
+        """
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._timer: Optional[threading.Timer] = None
+        self._detach: Optional[Callable[[], None]] = None
+
+        if parent is not None:
+            self._detach = parent.on_cancel(
+                lambda: self.cancel(parent.reason or "Run cancelled")
+            )
+        if timeout is not None:
+            self._timer = threading.Timer(
+                timeout, self.cancel, (f"Deadline of {timeout}s exceeded",)
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token has been cancelled."""
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Run cancelled") -> None:
+        """Cancel the token and run its callbacks (only the first call counts)."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # Aborting remote work is best effort
+                pass
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``callback`` when the token is cancelled.
+
+        The callback runs immediately if the token is already cancelled.
+
+        Returns:
+            A function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+
+        def remove() -> None:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+        return remove
+
+    def raise_if_cancelled(self) -> None:
+        """Raise :class:`RunCancelled` if the token has been cancelled."""
+        if self._event.is_set():
+            raise RunCancelled(self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the token is cancelled or ``timeout`` passes.
+
+        Returns:
+            Whether the token was cancelled
+        """
+        return self._event.wait(timeout)
+
+    def close(self) -> None:
+        """Stop the deadline timer and detach from the parent token."""
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._detach is not None:
+            self._detach()
+
+    @contextmanager
+    def activate(self) -> Iterator["CancelToken"]:
+        """Make this the token returned by :func:`current_token`."""
+        reset = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(reset)
+
+    def __repr__(self) -> str:
+        return f"CancelToken(cancelled={self.cancelled})"
+
+
+_current: ContextVar[Optional[CancelToken]] = ContextVar(
+    "foton_cancel_token", default=None
+)
+
+
+def current_token() -> Optional[CancelToken]:
+    """Return the token of the run executing the current node, if any."""
+    return _current.get()
+
+
+def check_cancelled() -> None:
+    """Raise :class:`RunCancelled` if the current run has been cancelled.
+
+    Long-running nodes call this between units of work.
+    """
+    token = _current.get()
+    if token is not None:
+        token.raise_if_cancelled()
@@ -0,0 +1,202 @@
+"""Structured progress events published while a graph runs."""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Iterator, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    """Base class of all events.
+
+    Attributes:
+        node: Name of the node the event is about
+        time: When the event happened (``time.time()``)
+    """
+
+    node: str
+    time: float
+
+
+@dataclass(frozen=True)
+class NodeStarted(Event):
+    """A node is about to execute or reuse its cached output."""
+
+    node_type: str
+
+
+@dataclass(frozen=True)
+class NodeFinished(Event):
+    """A node finished, successfully unless ``error`` is set."""
+
+    wall: float
+    cached: bool
+    error: Optional[BaseException] = None
+
+
+@dataclass(frozen=True)
+class QueueUpdate(Event):
+    """A log line from a queued or running fal request."""
+
+    message: str
+
+
+@dataclass(frozen=True)
+class UploadDone(Event):
+    """An input image was uploaded to fal storage."""
+
+    url: str
+    bytes: int
+
+
+@dataclass(frozen=True)
+class RefinementStep(Event):
+    """``IterativeRefinement`` finished a step (counted from 1)."""
+
+    step: int
+    steps: int
+    image_url: str
+    prompt: str
+
+
+Listener = Callable[[Any], None]
+
+
+class EventBus:
+    """Delivers events to subscribed listeners on a background thread.
+
+    Publishing only appends to a queue, so slow listeners never hold up the
+    nodes that publish. Listeners are called one event at a time, in the
+    order the events were published, from a dispatcher thread that exits
+    when the queue is empty. With no listeners, publishing does nothing.
+    """
+
+    def __init__(self) -> None:
+        # Replaced rather than mutated, so publishers can read it unlocked
+        self._listeners: Tuple[Tuple[Listener, Tuple[Type[Event], ...]], ...] = ()
+        self._queue: Deque[Tuple[Event, Tuple[Listener, ...]]] = deque()
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._dispatching = False
+
+    @property
+    def listening(self) -> bool:
+        """Whether anyone is subscribed."""
+        return bool(self._listeners)
+
+    def wants(self, event_type: Type[Event]) -> bool:
+        """Whether any listener is subscribed to ``event_type``."""
+        return any(issubclass(event_type, types) for _, types in self._listeners)
+
+    def subscribe(
+        self, listener: Listener, *event_types: Type[Event]
+    ) -> Callable[[], None]:
+        """Call ``listener`` with every published event of ``event_types``.
+
+        Args:
+            listener: Called with each event, on the dispatcher thread.
+                Exceptions are logged and otherwise ignored.
+            event_types: Event classes to receive. Defaults to all events.
+
+        Returns:
+            A function that unsubscribes the listener
+        """
+        entry = (listener, event_types or (Event,))
+        with self._condition:
+            self._listeners += (entry,)
+
+        def unsubscribe() -> None:
+            with self._condition:
+                self._listeners = tuple(e for e in self._listeners if e is not entry)
+
+        return unsubscribe
+
+    def publish(self, event: Event) -> None:
+        """Queue ``event`` for the listeners subscribed to its type."""
+        listeners = tuple(
+            listener for listener, types in self._listeners if isinstance(event, types)
+        )
+        if not listeners:
+            return
+        with self._condition:
+            self._queue.append((event, listeners))
+            self._pending += 1
+            if not self._dispatching:
+                self._dispatching = True
+                threading.Thread(
+                    target=self._dispatch, name="foton-events", daemon=True
+                ).start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every published event has been delivered.
+
+        Returns:
+            False if ``timeout`` passed first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._dispatching = False
+                    return
+                event, listeners = self._queue.popleft()
+            for listener in listeners:
+                try:
+                    listener(event)
+                except Exception:
+                    logger.exception("Event listener %r failed", listener)
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+
+_current: ContextVar[Optional[Tuple[EventBus, str]]] = ContextVar(
+    "foton_events", default=None
+)
+
+
+@contextmanager
+def node_events(bus: EventBus, node_name: str) -> Iterator[None]:
+    """Make :func:`emit` in the enclosed block publish on ``bus``."""
+    reset = _current.set((bus, node_name))
+    try:
+        yield
+    finally:
+        _current.reset(reset)
+
+
+def listening(event_type: Type[Event]) -> bool:
+    """Whether an event of ``event_type`` emitted now would be delivered.
+
+    Nodes can check this before computing expensive event fields.
+    """
+    current = _current.get()
+    return current is not None and current[0].wants(event_type)
+
+
+def emit(event_type: Type[Event], **fields: Any) -> None:
+    """Publish an event about the node currently executing.
+
+    The event is only constructed if someone listens for it; outside a run
+    this does nothing.
+
+    Args:
+        event_type: Event class, e.g. :class:`QueueUpdate`
+        fields: Fields of the event other than ``node`` and ``time``
+    """
+    current = _current.get()
+    if current is None:
+        return
+    bus, node_name = current
+    if bus.wants(event_type):
+        bus.publish(event_type(node_name, time.time(), **fields))
@@ -0,0 +1,209 @@
+"""Fusion of consecutive pixel-wise nodes into a single pass."""
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .base import Node, NodeOutput, Wire
+from .image import Image, map_pixels
+
+if TYPE_CHECKING:
+    from .graph import Graph
+
+
+class FusedPixelwise(Node):
+    """A chain of pixel-wise nodes executed as one kernel.
+
+    The input image is converted to float32 once, every stage's
+    :meth:`~foton.base.Node.apply_pixels` runs on the same buffer and the
+    result is quantized once at the end, instead of every stage converting
+    to and from PIL.
+    """
+
+    cpu_bound = True
+
+    def __init__(self, stages: List[Node], **kwargs: Any) -> None:
+        """Initialize the fused node.
+
+        Args:
+            stages: Pixel-wise nodes, in execution order. They are cloned
+                without their inputs, which the fused node feeds itself, so
+                shipping it to a worker process does not carry stale images.
+            **kwargs: Additional configuration
+        """
+        super().__init__(**kwargs)
+        self.stages = []
+        for stage in stages:
+            stage = stage.clone()
+            stage.inputs = {}
+            self.stages.append(stage)
+
+    def params(self) -> Dict[str, Any]:
+        params = super().params()
+        params["stages"] = [
+            [f"{type(stage).__module__}.{type(stage).__qualname__}", stage.params()]
+            for stage in self.stages
+        ]
+        return params
+
+    def _execute_unfused(self, image: Image) -> NodeOutput:
+        """Run the stages one by one (for images the fused path can't take)."""
+        output = NodeOutput(data={"image": image})
+        for stage in self.stages:
+            stage = stage.clone()
+            stage.inputs = {"image": output["image"]}
+            output = stage.execute(**stage.inputs)
+        return output
+
+    def execute(self, **inputs: Any) -> NodeOutput:
+        """Apply every stage to the input image in a single pass.
+
+        Args:
+            image: Input Image
+
+        Returns:
+            NodeOutput with 'image' containing the result of the last stage
+        """
+        image = self.get_input("image")
+        if image is None:
+            raise ValueError("No image provided for fused pixel-wise chain")
+
+        if not isinstance(image, Image):
+            raise TypeError(f"Expected Image, got {type(image)}")
+
+        if image.mode != "RGB":
+            return self._execute_unfused(image)
+
+        def apply_stages(pixels: np.ndarray) -> np.ndarray:
+            for stage in self.stages:
+                pixels = stage.apply_pixels(pixels)
+            return pixels
+
+        metadata = image.metadata.copy()
+        for stage in self.stages:
+            metadata.update(stage.pixel_metadata())
+
+        return NodeOutput(
+            data={
+                "image": Image(
+                    map_pixels(image, apply_stages), metadata=metadata, copy=False
+                )
+            },
+            metadata={
+                "fused": [stage.name for stage in self.stages],
+                "stages": [stage.pixel_metadata() for stage in self.stages],
+            },
+        )
+
+
+def _fusable_successor(graph: "Graph", node_name: str) -> Optional[str]:
+    """Return the node ``node_name`` can be fused into, if any.
+
+    ``node_name`` must be pixel-wise and feed exactly one wire, from its
+    ``image`` output to the ``image`` input of another pixel-wise node that
+    depends on nothing else. Nodes with a policy are never fused, since the
+    fused node could not honour each stage's retries and timeouts.
+    """
+    plan = graph._compile()
+    node = graph.nodes[node_name]
+    if not node.pixelwise or node.policy is not None:
+        return None
+    bindings = plan.bindings[node_name]
+    if len(bindings) != 1:
+        return None
+    binding = bindings[0]
+    if binding.source_output != "image" or binding.target_input != "image":
+        return None
+    target = binding.target_node
+    target_node = graph.nodes[target]
+    if not target_node.pixelwise or target_node.policy is not None:
+        return None
+    if len(plan.dependencies[target]) != 1:
+        return None
+    return target
+
+
+def find_pixelwise_chains(
+    graph: "Graph", protected: Iterable[str] = ()
+) -> List[List[str]]:
+    """Find maximal chains of two or more fusable pixel-wise nodes.
+
+    Args:
+        graph: Graph to analyse
+        protected: Nodes whose own outputs are needed (e.g. targets); they
+            can end a chain but not sit in the middle of one
+
+    Returns:
+        Chains of node names in execution order
+    """
+    protected = set(protected)
+    successor: Dict[str, str] = {}
+    for node_name in graph._compile().order:
+        if node_name in protected:
+            continue
+        target = _fusable_successor(graph, node_name)
+        if target is not None:
+            successor[node_name] = target
+
+    heads = set(successor).difference(successor.values())
+    chains = []
+    for node_name in graph._compile().order:
+        if node_name not in heads:
+            continue
+        chain = [node_name]
+        while chain[-1] in successor:
+            chain.append(successor[chain[-1]])
+        chains.append(chain)
+    return chains
+
+
+def fuse_pixelwise(
+    graph: "Graph", protected: Iterable[str] = ()
+) -> Tuple["Graph", Dict[str, List[str]]]:
+    """Return a copy of ``graph`` with pixel-wise chains fused.
+
+    Each chain is replaced by a :class:`FusedPixelwise` node named after the
+    chain's last node, so downstream wires and output names are unchanged.
+    Nodes outside chains are shared with ``graph``.
+
+    Args:
+        graph: Graph to optimize
+        protected: Nodes that must keep their own outputs
+
+    Returns:
+        The fused graph and a mapping of fused node name to chain members
+    """
+    from .graph import Graph
+
+    chains = find_pixelwise_chains(graph, protected)
+    fused = Graph(cache=graph.cache, stats=graph.stats, tracer=graph.tracer)
+    fused._latencies = graph._latencies
+    if not chains:
+        fused.nodes = dict(graph.nodes)
+        fused.wires = graph.wires
+        return fused, {}
+
+    groups: Dict[str, List[str]] = {}
+    member_of: Dict[str, str] = {}
+    for chain in chains:
+        groups[chain[-1]] = chain
+        for member in chain:
+            member_of[member] = chain[-1]
+
+    for node_name, node in graph.nodes.items():
+        if node_name in groups:
+            stages = [graph.nodes[member] for member in groups[node_name]]
+            fused.add(node_name, FusedPixelwise(stages))
+        elif node_name not in member_of:
+            fused.nodes[node_name] = node
+
+    for wire in graph.wires:
+        if wire.target_node in member_of:
+            group = member_of[wire.target_node]
+            if wire.target_node != groups[group][0]:
+                # Internal to the chain
+                continue
+            wire = Wire(wire.source, f"{group}.{wire.target_input}")
+        fused.wires.append(wire)
+
+    return fused, groups
@@ -1,19 +1,77 @@
 """Core Graph implementation for EditGraph."""
 
-from typing import Any, Dict, List, Optional, Union
-from collections import defaultdict, deque
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ContextManager,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-from .base import Node, Wire, NodeOutput
+from .base import Node, NodeOutput, Wire
+from .cache import CacheStore, fingerprint_node, fingerprint_value
+from .cancel import CancelToken, RunCancelled
+from .events import EventBus, NodeFinished, NodeStarted, node_events
+from .fusion import fuse_pixelwise
+from .plan import ExecutionPlan
+from .policy import Latencies, Policy, aexecute_with_policy, execute_with_policy
+from .process import create_process_pool, execute_in_process
+from .profile import NodeProfile, RunProfile, measure, trace_memory
+from .stats import TimingStats, node_type
+from .tracing import Span, Tracer
+
+if TYPE_CHECKING:
+    from .batch import BatchResult
+    from .stream import GraphStream
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    """Number of worker threads used when none is given (as ThreadPoolExecutor)."""
+    return min(32, (os.cpu_count() or 1) + 4)
 
 
 class ExecutionResult:
     """Result of graph execution."""
 
     def __init__(
-        self, outputs: Dict[str, NodeOutput], execution_order: List[str]
+        self,
+        outputs: Dict[str, NodeOutput],
+        execution_order: List[str],
+        cached: Optional[List[str]] = None,
+        profile: Optional[RunProfile] = None,
     ) -> None:
         self.outputs = outputs
         self.execution_order = execution_order
+        self.cached = cached or []
+        # Per-node timings and resource use (see foton.profile)
+        self.profile = profile
 
     def get_node_output(self, node_name: str) -> Optional[NodeOutput]:
         """Get output from a specific node."""
@@ -23,20 +81,344 @@ class ExecutionResult:
         return self.outputs[key]
 
 
+class _RunState:
+    """Bookkeeping for a single execution of a compiled plan.
+
+    Shared by all executors: tracks remaining dependencies, delivers outputs
+    to downstream nodes and reuses outputs whose fingerprint is unchanged
+    since the previous run or present in the graph's persistent cache store.
+
+    With ``free_intermediates`` the state also tracks how many consumers of
+    each output are still pending, and drops an output (and the consumers'
+    references to it) as soon as its last consumer has finished, unless the
+    node is in ``keep``.
+
+    If a ``process_pool`` is given, nodes that declare themselves
+    ``cpu_bound`` are executed in it instead of the calling thread.
+
+    Nodes execute with ``token`` as the current cancel token, and no node
+    starts once it has been cancelled. Every node gets a span of the graph's
+    tracer, as a child of ``run_span``, and its start and end are published
+    on the graph's event bus.
+    """
+
+    def __init__(
+        self,
+        graph: "Graph",
+        plan: ExecutionPlan,
+        use_cache: bool,
+        free_intermediates: bool = False,
+        keep: Optional[Iterable[str]] = None,
+        process_pool: Optional[Executor] = None,
+        token: Optional[CancelToken] = None,
+        run_span: Optional[Span] = None,
+    ) -> None:
+        self.graph = graph
+        self.run_span = run_span
+        self.process_pool = process_pool
+        self.token = token or CancelToken()
+        self.plan = plan
+        self.use_cache = use_cache
+        self.free_intermediates = free_intermediates
+        self.keep = set(plan.sinks if keep is None else keep)
+        unknown = self.keep.difference(plan.in_degree)
+        if unknown:
+            raise ValueError(f"Cannot keep unknown nodes: {sorted(unknown)}")
+        self.pending_consumers = dict(plan.consumer_count)
+        self.remaining = dict(plan.in_degree)
+        self.fingerprints, self.uncacheable = graph._fingerprints(plan)
+        self.outputs: Dict[str, NodeOutput] = {}
+        self.order: List[str] = []
+        self.cached: List[str] = []
+        self.cache_entries: Dict[str, Tuple[str, NodeOutput]] = {}
+        self.started = time.perf_counter()
+        # When each node's last dependency finished, for queue wait times
+        self.ready_at = {name: self.started for name in self.initial()}
+        self.profiles: Dict[str, NodeProfile] = {}
+
+    def initial(self) -> List[str]:
+        """Nodes that have no dependencies."""
+        return [name for name in self.plan.order if self.remaining[name] == 0]
+
+    def take_cached(self, node_name: str) -> Optional[NodeOutput]:
+        """Return a cached output for ``node_name`` if it can be reused.
+
+        The in-memory results of the previous run are checked first, then the
+        graph's persistent cache store.
+        """
+        if not self._cacheable(node_name):
+            return None
+        fingerprint = self.fingerprints[node_name]
+        output = None
+        entry = self.graph._execution_cache.get(node_name)
+        if entry is not None and entry[0] == fingerprint:
+            output = entry[1]
+        if output is None and self.graph.cache is not None:
+            output = self.graph.cache.get(fingerprint)
+        if output is not None:
+            self.cached.append(node_name)
+        return output
+
+    def execute(self, node_name: str) -> NodeOutput:
+        """Reuse a cached output for ``node_name`` or execute the node.
+
+        Safe to call from worker threads; freshly computed outputs are written
+        to the persistent cache store by the calling thread.
+        """
+        self.token.raise_if_cancelled()
+        profile = self._profile(node_name)
+        with self._announce(node_name, profile), self._span(node_name) as span, measure(
+            profile, self.started
+        ):
+            output = self.take_cached(node_name)
+            profile.cached = output is not None
+            span.set_attribute("foton.node.cached", profile.cached)
+            if output is None:
+                with self.token.activate():
+                    output = self.graph._execute_node(node_name, self.process_pool)
+        if not profile.cached:
+            self._record_time(node_name, profile.wall)
+            if self._should_store(node_name):
+                self._store(node_name, output)
+        return output
+
+    async def aexecute(self, node_name: str) -> NodeOutput:
+        """Async variant of :meth:`execute`; cache store I/O runs in a thread."""
+        self.token.raise_if_cancelled()
+        loop = asyncio.get_running_loop()
+        profile = self._profile(node_name)
+        with self._announce(node_name, profile), self._span(node_name) as span, measure(
+            profile, self.started, cpu=False
+        ):
+            if self.graph.cache is None:
+                output = self.take_cached(node_name)
+            else:
+                output = await loop.run_in_executor(None, self.take_cached, node_name)
+            profile.cached = output is not None
+            span.set_attribute("foton.node.cached", profile.cached)
+            if output is None:
+                with self.token.activate():
+                    output = await self.graph._aexecute_node(node_name)
+
+        if not profile.cached:
+            self._record_time(node_name, profile.wall)
+            if self._should_store(node_name):
+                await loop.run_in_executor(None, self._store, node_name, output)
+        return output
+
+    @contextmanager
+    def _announce(self, node_name: str, profile: NodeProfile) -> Iterator[None]:
+        """Publish the start and end of ``node_name`` and route its events."""
+        events = self.graph.events
+        if events.wants(NodeStarted):
+            events.publish(NodeStarted(node_name, time.time(), profile.node_type))
+        error: Optional[BaseException] = None
+        try:
+            with node_events(events, node_name):
+                yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if events.wants(NodeFinished):
+                events.publish(
+                    NodeFinished(
+                        node_name, time.time(), profile.wall, profile.cached, error
+                    )
+                )
+
+    def _span(self, node_name: str) -> ContextManager[Span]:
+        """Open the span of ``node_name`` under the run's span."""
+        node = self.graph.nodes[node_name]
+        return self.graph.tracer.span(
+            "foton.node",
+            {
+                "foton.node.name": node_name,
+                "foton.node.type": node_type(node),
+                "foton.node.fingerprint": self.fingerprints[node_name],
+            },
+            parent=self.run_span,
+        )
+
+    def _profile(self, node_name: str) -> NodeProfile:
+        """Start the profile of ``node_name``, which is about to run."""
+        ready_at = self.ready_at.get(node_name, self.started)
+        profile = NodeProfile(
+            node_name,
+            node_type(self.graph.nodes[node_name]),
+            queue_wait=time.perf_counter() - ready_at,
+        )
+        self.profiles[node_name] = profile
+        return profile
+
+    def _record_time(self, node_name: str, seconds: float) -> None:
+        if self.graph.stats is not None:
+            self.graph.stats.record(self.graph.nodes[node_name], seconds)
+
+    def estimate_costs(self) -> Dict[str, float]:
+        """Expected execution time of every node in the plan.
+
+        Nodes whose previous output can be reused from memory cost nothing;
+        everything else is estimated from the graph's timing stats.
+        """
+        stats = self.graph.stats or TimingStats()
+        costs = {}
+        for node_name in self.plan.order:
+            node = self.graph.nodes[node_name]
+            entry = self.graph._execution_cache.get(node_name)
+            if (
+                self._cacheable(node_name)
+                and entry is not None
+                and entry[0] == self.fingerprints[node_name]
+            ):
+                costs[node_name] = 0.0
+            else:
+                costs[node_name] = stats.estimate(node)
+        return costs
+
+    def _cacheable(self, node_name: str) -> bool:
+        return (
+            self.use_cache
+            and self.graph.nodes[node_name].cacheable
+            and node_name not in self.uncacheable
+        )
+
+    def _should_store(self, node_name: str) -> bool:
+        return (
+            self.graph.cache is not None
+            and self.graph.nodes[node_name].cacheable
+            and node_name not in self.uncacheable
+        )
+
+    def _store(self, node_name: str, output: NodeOutput) -> None:
+        """Write ``output`` to the cache store, on a best-effort basis.
+
+        The node has already succeeded, so a store that cannot take its
+        output (full disk, unpicklable value, ...) must not fail the run.
+        """
+        cache = self.graph.cache
+        assert cache is not None
+        try:
+            cache.put(self.fingerprints[node_name], output)
+        except Exception:
+            logger.exception(
+                "Could not store the output of node '%s' in the cache", node_name
+            )
+
+    def complete(self, node_name: str, output: NodeOutput) -> List[str]:
+        """Record a finished node and return the dependents it made ready."""
+        self.outputs[node_name] = output
+        self.order.append(node_name)
+        if self.graph.nodes[node_name].cacheable and node_name not in self.uncacheable:
+            self.cache_entries[node_name] = (self.fingerprints[node_name], output)
+        self.graph._push_outputs(node_name, output, self.plan)
+
+        if self.free_intermediates:
+            self._release(node_name)
+
+        ready = []
+        for dependent in self.plan.dependents[node_name]:
+            self.remaining[dependent] -= 1
+            if self.remaining[dependent] == 0:
+                ready.append(dependent)
+                self.ready_at[dependent] = time.perf_counter()
+        return ready
+
+    def _release(self, node_name: str) -> None:
+        """Drop references that are dead now that ``node_name`` has run."""
+        # The node has consumed its wired inputs; inputs the caller set on
+        # the node directly stay for the next run
+        inputs = self.graph.nodes[node_name].inputs
+        for dependency in self.plan.dependencies[node_name]:
+            for binding in self.plan.bindings[dependency]:
+                if binding.target_node == node_name:
+                    inputs.pop(binding.target_input, None)
+            self.pending_consumers[dependency] -= 1
+            if self.pending_consumers[dependency] == 0:
+                self._drop(dependency)
+        if self.pending_consumers[node_name] == 0:
+            self._drop(node_name)
+
+    def _drop(self, node_name: str) -> None:
+        if node_name in self.keep:
+            return
+        self.outputs.pop(node_name, None)
+        self.cache_entries.pop(node_name, None)
+
+    def finish(self, success: bool) -> None:
+        """Store this run's outputs for the next incremental run.
+
+        Only nodes in this run's plan are touched, so a targeted run keeps
+        the cached results of the branches it skipped.
+        """
+        cache = self.graph._execution_cache
+        if success:
+            for node_name in self.plan.order:
+                if node_name not in self.cache_entries:
+                    cache.pop(node_name, None)
+        # After a failure keep what finished, so a retry does not redo it
+        cache.update(self.cache_entries)
+        if self.graph.stats is not None:
+            self.graph.stats.save()
+
+    def result(self) -> ExecutionResult:
+        profile = RunProfile(
+            list(self.profiles.values()), time.perf_counter() - self.started
+        )
+        return ExecutionResult(self.outputs, self.order, self.cached, profile)
+
+
 class Graph:
     """Main graph class for building and executing image processing pipelines."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache: Optional[CacheStore] = None,
+        stats: Optional[TimingStats] = None,
+        tracer: Optional[Tracer] = None,
+    ) -> None:
+        """Initialize a graph.
+
+        Args:
+            cache: Optional persistent store (e.g. :class:`foton.cache.DiskCache`)
+                consulted before executing cacheable nodes
+            stats: Optional store of per-node-type execution times, updated by
+                every run and used by the ``"critical_path"`` schedule
+            tracer: Receives spans for runs, nodes, uploads, fal requests and
+                downloads (see :mod:`foton.tracing`). Defaults to a no-op
+                tracer.
+        """
+        self.cache = cache
+        self.stats = stats
+        self.tracer = tracer or Tracer()
+        # Progress events of every run; subscribe with graph.events.subscribe
+        self.events = EventBus()
+        # Hash of the spec this graph was built from, until it is modified
+        self.spec_hash: Optional[str] = None
         self.nodes: Dict[str, Node] = {}
         self.wires: List[Wire] = []
-        self._execution_cache: Optional[ExecutionResult] = None
+        # Fingerprint and output of each node from the last run that ran it
+        self._execution_cache: Dict[str, Tuple[str, NodeOutput]] = {}
+        self._plan: Optional[ExecutionPlan] = None
+        # Fused copy of this graph (see run(fuse=True)): protected nodes,
+        # the fused graph and its chains
+        self._fused: Optional[Tuple[FrozenSet[str], "Graph", Dict[str, List[str]]]] = (
+            None
+        )
+        # Cancel tokens of the runs in progress, shared with forks
+        self._runs: Set[CancelToken] = set()
+        self._runs_lock = threading.Lock()
+        # Recent latencies of each node with a policy, shared with forks
+        self._latencies: Dict[str, Latencies] = {}
 
-    def add(self, name: str, node: Node) -> "Graph":
+    def add(self, name: str, node: Node, policy: Optional[Policy] = None) -> "Graph":
         """Add a node to the graph.
 
         Args:
             name: Unique name for the node
             node: Node instance to add
+            policy: Retries, timeouts and hedging for the node, e.g.
+                ``Policy(max_attempts=3, attempt_timeout=120, hedge_quantile=0.95)``
 
         Returns:
             Self for method chaining
@@ -45,8 +427,12 @@ class Graph:
             raise ValueError(f"Node with name '{name}' already exists")
 
         node.name = name
+        if policy is not None:
+            node.policy = policy
         self.nodes[name] = node
-        self._execution_cache = None
+        self._plan = None
+        self._fused = None
+        self.spec_hash = None
         return self
 
     def wire(self, connection: str) -> "Graph":
@@ -75,107 +461,712 @@ class Graph:
             wire = Wire(source, target)
             self.wires.append(wire)
 
-        self._execution_cache = None
+        self._plan = None
+        self._fused = None
+        self.spec_hash = None
         return self
 
-    def _build_dependency_graph(self) -> Dict[str, List[str]]:
-        """Build dependency graph for topological sorting."""
-        dependencies = defaultdict(list)
+    def _compile(self, targets: Optional[Iterable[str]] = None) -> ExecutionPlan:
+        """Return the execution plan, compiling it if the graph has changed.
 
-        # All nodes start with no dependencies
-        for node_name in self.nodes:
-            dependencies[node_name] = []
+        The plan is cached until the next call to :meth:`add` or :meth:`wire`,
+        so repeated runs of an unchanged graph skip planning entirely.
 
-        # Add dependencies based on wires
-        for wire in self.wires:
-            if wire.target_node not in dependencies:
-                dependencies[wire.target_node] = []
-            if wire.source_node not in dependencies[wire.target_node]:
-                dependencies[wire.target_node].append(wire.source_node)
+        Args:
+            targets: If given, prune the plan to these nodes and their
+                ancestors
+        """
+        if self._plan is None:
+            self._plan = ExecutionPlan.compile(self.nodes, self.wires)
+        if targets is not None:
+            return self._plan.subplan(targets)
+        return self._plan
 
-        return dependencies
+    @staticmethod
+    def _target_nodes(targets: Iterable[str]) -> List[str]:
+        """Map targets like ``"export.image"`` or ``"export"`` to node names."""
+        if isinstance(targets, str):
+            targets = [targets]
+        return [target.split(".", 1)[0].strip() for target in targets]
+
+    def _build_dependency_graph(self) -> Dict[str, List[str]]:
+        """Build dependency graph for topological sorting."""
+        return self._compile().dependencies
 
     def _topological_sort(self) -> List[str]:
         """Perform topological sort to determine execution order."""
-        dependencies = self._build_dependency_graph()
-
-        # Count incoming edges
-        in_degree = {node: len(deps) for node, deps in dependencies.items()}
-
-        # Find nodes with no dependencies
-        queue = deque([node for node, degree in in_degree.items() if degree == 0])
-        result = []
-
-        while queue:
-            node = queue.popleft()
-            result.append(node)
-
-            # Remove this node from other nodes' dependencies
-            for target_node, deps in dependencies.items():
-                if node in deps:
-                    in_degree[target_node] -= 1
-                    if in_degree[target_node] == 0:
-                        queue.append(target_node)
-
-        if len(result) != len(self.nodes):
-            raise ValueError("Circular dependency detected in graph")
-
-        return result
-
-    def _propagate_data(self, execution_outputs: Dict[str, NodeOutput]) -> None:
-        """Propagate data through wires to set node inputs."""
-        print(self.wires)
-        for wire in self.wires:
-            # Get source output
-            try:
-                source_output = execution_outputs[wire.source_node]
-                output_value = source_output.get(wire.source_output)
-
-                if output_value is None:
-                    raise ValueError(
-                        f"Source node '{wire.source_node}' has no output '{wire.source_output}'"
-                    )
+        return list(self._compile().order)
 
-                # Set target input
-                target_node = self.nodes[wire.target_node]
-                target_node.set_input(wire.target_input, output_value)
-            except Exception as e:
-                pass
+    def _push_outputs(
+        self, node_name: str, output: NodeOutput, plan: ExecutionPlan
+    ) -> None:
+        """Deliver the outputs of ``node_name`` to the nodes wired to it.
+
+        Only the node's own bindings in ``plan`` (the run's plan, which for a
+        targeted run leaves out nodes that will not execute) are visited, so
+        the cost is proportional to its out-degree rather than the graph size.
+        """
+        for binding in plan.bindings[node_name]:
+            output_value = output.get(binding.source_output)
+            if output_value is None:
+                continue
+            self.nodes[binding.target_node].set_input(
+                binding.target_input, output_value
+            )
+
+    def _execute_node(
+        self, node_name: str, process_pool: Optional[Executor] = None
+    ) -> NodeOutput:
+        """Execute a single node with its current inputs.
+
+        CPU-bound nodes run in ``process_pool`` when one is given, with image
+        inputs and outputs passed through shared memory. Nodes with a
+        :class:`~foton.policy.Policy` are retried, timed out and hedged
+        according to it.
+        """
+
+        def run(node: Node) -> NodeOutput:
+            if process_pool is not None and node.cpu_bound:
+                return execute_in_process(process_pool, node)
+            return node.execute(**node.inputs)
+
+        node = self.nodes[node_name]
+        try:
+            if node.policy is not None:
+                return execute_with_policy(
+                    node.policy, node, run, self._node_latencies(node_name)
+                )
+            return run(node)
+        except RunCancelled:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error executing node '{node_name}': {str(e)}") from e
+
+    def _node_latencies(self, node_name: str) -> Latencies:
+        with self._runs_lock:
+            return self._latencies.setdefault(node_name, Latencies())
+
+    def _fingerprints(self, plan: ExecutionPlan) -> Tuple[Dict[str, str], Set[str]]:
+        """Fingerprint every node from its config and its inputs' fingerprints.
 
-    def run(self) -> ExecutionResult:
+        Returns:
+            The fingerprints, and the nodes whose outputs must not be reused
+            because an input set on them (or on a node upstream) cannot be
+            hashed by content. Those nodes get a fingerprint unique to this
+            run.
+        """
+        wired: Dict[str, Dict[str, str]] = {name: {} for name in plan.order}
+        fingerprints: Dict[str, str] = {}
+        uncacheable: Set[str] = set()
+
+        for node_name in plan.order:
+            node = self.nodes[node_name]
+            inputs = wired[node_name]
+            # Inputs set directly on the node rather than through a wire
+            for key, value in node.inputs.items():
+                if key not in inputs:
+                    value_fingerprint = fingerprint_value(value)
+                    if value_fingerprint is None:
+                        uncacheable.add(node_name)
+                        value_fingerprint = uuid.uuid4().hex
+                    inputs[key] = value_fingerprint
+
+            fingerprint = fingerprint_node(node, inputs)
+            fingerprints[node_name] = fingerprint
+            for binding in plan.bindings[node_name]:
+                wired[binding.target_node][
+                    binding.target_input
+                ] = f"{fingerprint}.{binding.source_output}"
+                if node_name in uncacheable:
+                    uncacheable.add(binding.target_node)
+
+        return fingerprints, uncacheable
+
+    def _fork(self) -> "Graph":
+        """Return a graph sharing this graph's structure and caches.
+
+        The fork has private clones of the nodes so it can run concurrently
+        with the original (and with other forks) without sharing inputs.
+        """
+        fork = Graph(cache=self.cache, stats=self.stats, tracer=self.tracer)
+        fork.nodes = {name: node.clone() for name, node in self.nodes.items()}
+        fork.wires = self.wires
+        fork._plan = self._compile()
+        fork.spec_hash = self.spec_hash
+        fork._execution_cache = self._execution_cache
+        fork._runs = self._runs
+        fork._runs_lock = self._runs_lock
+        fork._latencies = self._latencies
+        fork.events = self.events
+        return fork
+
+    @contextmanager
+    def _cancel_scope(
+        self,
+        cancel_token: Optional[CancelToken] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[CancelToken]:
+        """Create the token of a run and register it for :meth:`cancel`."""
+        token = CancelToken(timeout=timeout, parent=cancel_token)
+        with self._runs_lock:
+            self._runs.add(token)
+        try:
+            yield token
+        finally:
+            with self._runs_lock:
+                self._runs.discard(token)
+            token.close()
+
+    def cancel(self, reason: str = "Run cancelled") -> None:
+        """Cancel every run of this graph that is in progress.
+
+        Covers :meth:`run`, :meth:`arun`, :meth:`run_batch` and
+        :meth:`stream`, from any thread. No further nodes are started, nodes
+        that check for cancellation stop at their next check, queued fal
+        requests are cancelled, and the run raises
+        :class:`~foton.cancel.RunCancelled`.
+
+        Args:
+            reason: Message of the RunCancelled raised by the runs
+        """
+        with self._runs_lock:
+            runs = list(self._runs)
+        for token in runs:
+            token.cancel(reason)
+
+    def clear_cache(self) -> None:
+        """Forget cached outputs so the next run re-executes every node."""
+        self._execution_cache = {}
+        if self._fused is not None:
+            self._fused[1].clear_cache()
+
+    def _fused_graph(
+        self, keep: Optional[Iterable[str]], targets: Optional[Iterable[str]]
+    ) -> Tuple["Graph", Dict[str, List[str]]]:
+        """Return this graph with pixel-wise chains fused (see :mod:`.fusion`).
+
+        Targets and kept nodes are never fused away. The fused graph is cached,
+        together with its own execution cache, until the structure changes.
+        """
+        protected = set(keep or ())
+        if targets is not None:
+            protected.update(self._target_nodes(targets))
+        key = frozenset(protected)
+        if self._fused is None or self._fused[0] != key:
+            fused, groups = fuse_pixelwise(self, protected)
+            # So that cancel() and event listeners reach runs of the fused graph
+            fused._runs = self._runs
+            fused._runs_lock = self._runs_lock
+            fused.events = self.events
+            self._fused = (key, fused, groups)
+        return self._fused[1], self._fused[2]
+
+    @staticmethod
+    def _unfuse(result: ExecutionResult, groups: Dict[str, List[str]]) -> None:
+        """Report fused nodes as the chains they replaced."""
+        if not groups:
+            return
+        result.execution_order = [
+            member
+            for node_name in result.execution_order
+            for member in groups.get(node_name, [node_name])
+        ]
+        result.cached = [
+            member
+            for node_name in result.cached
+            for member in groups.get(node_name, [node_name])
+        ]
+
+    def _start(
+        self,
+        use_cache: bool,
+        free_intermediates: bool,
+        keep: Optional[Iterable[str]],
+        targets: Optional[Iterable[str]],
+        process_pool: Optional[Executor] = None,
+        token: Optional[CancelToken] = None,
+        run_span: Optional[Span] = None,
+    ) -> _RunState:
+        """Create the run state for a (possibly targeted) run."""
+        target_nodes = None
+        if targets is not None:
+            target_nodes = self._target_nodes(targets)
+            if keep is None:
+                keep = target_nodes
+        plan = self._compile(target_nodes)
+        return _RunState(
+            self,
+            plan,
+            use_cache,
+            free_intermediates,
+            keep,
+            process_pool,
+            token,
+            run_span,
+        )
+
+    @contextmanager
+    def _run_scope(
+        self,
+        cancel_token: Optional[CancelToken],
+        timeout: Optional[float],
+        profile_memory: bool,
+        attributes: Dict[str, Any],
+    ) -> Iterator[Tuple[CancelToken, Span]]:
+        """Set up cancellation, memory tracing and the span of a run."""
+        with self._cancel_scope(cancel_token, timeout) as token:
+            with trace_memory(profile_memory):
+                with self.tracer.span("foton.run", attributes) as run_span:
+                    yield token, run_span
+
+    def run(
+        self,
+        executor: str = "sequential",
+        max_workers: Optional[int] = None,
+        use_cache: bool = True,
+        free_intermediates: bool = False,
+        keep: Optional[Iterable[str]] = None,
+        targets: Optional[Iterable[str]] = None,
+        max_processes: Optional[int] = None,
+        fuse: bool = False,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+        schedule: str = "fifo",
+        profile_memory: bool = False,
+    ) -> ExecutionResult:
         """Execute the graph and return results.
 
+        Runs are incremental: a node whose fingerprint (its class, params and
+        the fingerprints of its inputs) is unchanged since the previous run
+        reuses that run's output instead of executing again.
+
+        Args:
+            executor: ``"sequential"`` runs nodes one at a time in topological
+                order. ``"threads"`` dispatches every node whose dependencies
+                are satisfied onto a thread pool, so independent branches run
+                concurrently.
+            max_workers: Maximum number of worker threads for the
+                ``"threads"`` executor. Defaults to the ThreadPoolExecutor
+                default.
+            use_cache: Reuse outputs of unchanged nodes from the previous run
+                or the graph's cache store
+            free_intermediates: Release each node's outputs, and the inputs
+                held by its consumers, as soon as the last consumer has run.
+                Only the outputs of nodes in ``keep`` are returned (and kept
+                for the next incremental run).
+            keep: Nodes whose outputs survive ``free_intermediates``.
+                Defaults to the targets, or the graph's sink nodes.
+            targets: Outputs the caller needs, e.g. ``["preview.image"]``.
+                Only these nodes and their ancestors are executed; cached
+                results are reused as usual.
+            max_processes: If set, nodes with ``cpu_bound = True`` (such as
+                ``ColorGrade``) run in a pool of this many worker processes,
+                with images handed over through shared memory. Most useful
+                with the ``"threads"`` executor.
+            fuse: Run chains of pixel-wise nodes (``pixelwise = True``, such
+                as ``ColorGrade``) as a single pass over the pixels. Chain
+                members other than the last produce no outputs of their own
+                unless they are targets or in ``keep``.
+            timeout: Cancel the run if it takes longer than this many seconds
+            cancel_token: Cancel the run when this token is cancelled; see
+                also :meth:`cancel`
+            schedule: Order in which the ``"threads"`` executor starts ready
+                nodes (other executors only accept ``"fifo"``). ``"fifo"``
+                starts them as they become ready.
+                ``"critical_path"`` keeps at most ``max_workers`` nodes
+                running and gives free workers to the ready node with the
+                longest estimated remaining path, using the graph's
+                :class:`~foton.stats.TimingStats`.
+            profile_memory: Trace allocations with :mod:`tracemalloc` so
+                ``result.profile`` includes each node's peak memory (for
+                nodes that did not run concurrently with another). Slows
+                the run down noticeably.
+
         Returns:
-            ExecutionResult containing outputs from all nodes
+            ExecutionResult containing outputs from the executed nodes and,
+            in ``profile``, the timings and resource use of every node
+
+        Raises:
+            RunCancelled: If the run was cancelled or timed out
         """
         if not self.nodes:
             raise ValueError("Cannot run empty graph")
 
-        # Get execution order
-        execution_order = self._topological_sort()
+        if executor not in ("sequential", "threads"):
+            raise ValueError(f"Unknown executor: {executor}")
 
-        # Execute nodes in order
-        execution_outputs: Dict[str, NodeOutput] = {}
+        if schedule not in ("fifo", "critical_path"):
+            raise ValueError(f"Unknown schedule: {schedule}")
 
-        for node_name in execution_order:
-            node = self.nodes[node_name]
+        if schedule != "fifo" and executor != "threads":
+            raise ValueError(
+                f"The {schedule!r} schedule requires executor='threads'; "
+                f"the {executor!r} executor runs nodes in plan order"
+            )
+
+        if fuse:
+            fused, groups = self._fused_graph(keep, targets)
+            result = fused.run(
+                executor=executor,
+                max_workers=max_workers,
+                use_cache=use_cache,
+                free_intermediates=free_intermediates,
+                keep=keep,
+                targets=targets,
+                max_processes=max_processes,
+                timeout=timeout,
+                cancel_token=cancel_token,
+                schedule=schedule,
+                profile_memory=profile_memory,
+            )
+            self._unfuse(result, groups)
+            return result
+
+        process_pool = create_process_pool(max_processes) if max_processes else None
+        try:
+            attributes = {
+                "foton.executor": executor,
+                "foton.nodes": len(self.nodes),
+                "foton.targets": list(targets or []),
+            }
+            with self._run_scope(cancel_token, timeout, profile_memory, attributes) as (
+                token,
+                run_span,
+            ):
+                state = self._start(
+                    use_cache,
+                    free_intermediates,
+                    keep,
+                    targets,
+                    process_pool,
+                    token,
+                    run_span,
+                )
+                try:
+                    if executor == "threads":
+                        self._run_threaded(state, max_workers, schedule)
+                    else:
+                        self._run_sequential(state)
+                except BaseException:
+                    state.finish(success=False)
+                    raise
+                state.finish(success=True)
+        finally:
+            if process_pool is not None:
+                process_pool.shutdown()
+        return state.result()
+
+    def _run_sequential(self, state: _RunState) -> None:
+        """Execute nodes one at a time in topological order."""
+        for node_name in state.plan.order:
+            state.complete(node_name, state.execute(node_name))
+
+    def _run_threaded(
+        self, state: _RunState, max_workers: Optional[int], schedule: str = "fifo"
+    ) -> None:
+        """Execute independent nodes concurrently on a thread pool.
+
+        Nodes are submitted as soon as all of their dependencies have
+        finished, and their outputs are pushed to downstream nodes from the
+        calling thread, so node inputs are never written concurrently.
+
+        With the ``"critical_path"`` schedule, ready nodes wait in a priority
+        queue ordered by estimated remaining path length, and are submitted
+        only while a worker is free, so priorities decide who runs next.
+
+        The first failure cancels the run's token, so nodes still in flight
+        stop at their next cancellation check instead of running to the end.
+        """
+        workers = max_workers or default_workers()
+        if schedule == "critical_path":
+            remaining = state.plan.critical_path(state.estimate_costs())
+            limit: Optional[int] = workers
+        else:
+            remaining = dict.fromkeys(state.plan.order, 0.0)
+            limit = None
+
+        # (-remaining path, arrival, node name): ties keep arrival order
+        ready: List[Tuple[float, int, str]] = []
+        arrival = itertools.count()
+
+        def push(node_names: Iterable[str]) -> None:
+            for node_name in node_names:
+                heapq.heappush(ready, (-remaining[node_name], next(arrival), node_name))
+
+        push(state.initial())
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while running or ready:
+                while ready and (limit is None or len(running) < limit):
+                    _, _, node_name = heapq.heappop(ready)
+                    running[pool.submit(state.execute, node_name)] = node_name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_name = running.pop(future)
+                    try:
+                        output = future.result()
+                    except Exception:
+                        # Start nothing new and stop in-flight nodes early
+                        state.token.cancel(f"Node '{node_name}' failed")
+                        for pending in running:
+                            pending.cancel()
+                        raise
+                    push(state.complete(node_name, output))
+
+    async def _aexecute_node(self, node_name: str) -> NodeOutput:
+        """Execute a single node asynchronously with its current inputs."""
+        node = self.nodes[node_name]
+        try:
+            if node.policy is not None:
+                return await aexecute_with_policy(
+                    node.policy,
+                    node,
+                    lambda node: node.aexecute(**node.inputs),
+                    self._node_latencies(node_name),
+                )
+            return await node.aexecute(**node.inputs)
+        except RunCancelled:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error executing node '{node_name}': {str(e)}") from e
+
+    async def arun(
+        self,
+        use_cache: bool = True,
+        free_intermediates: bool = False,
+        keep: Optional[Iterable[str]] = None,
+        targets: Optional[Iterable[str]] = None,
+        fuse: bool = False,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+        profile_memory: bool = False,
+    ) -> ExecutionResult:
+        """Execute the graph on the running event loop.
+
+        Every node whose dependencies are satisfied is scheduled as a task, so
+        independent branches are awaited concurrently. Nodes without a native
+        ``aexecute`` run their blocking ``execute`` in a worker thread.
+
+        Args:
+            use_cache: Reuse outputs of unchanged nodes from the previous run
+                or the graph's cache store
+            free_intermediates: Release outputs once their last consumer has
+                run; see :meth:`run`
+            keep: Nodes whose outputs survive ``free_intermediates``
+            targets: Only execute these outputs and their ancestors; see
+                :meth:`run`
+            fuse: Run pixel-wise chains as a single pass; see :meth:`run`
+            timeout: Cancel the run if it takes longer than this many seconds
+            cancel_token: Cancel the run when this token is cancelled
+            profile_memory: Record peak traced memory per node; see
+                :meth:`run`
+
+        Returns:
+            ExecutionResult containing outputs from the executed nodes
+
+        Raises:
+            RunCancelled: If the run was cancelled or timed out. Node tasks
+                are cancelled, which also cancels their queued fal requests.
+        """
+        if not self.nodes:
+            raise ValueError("Cannot run empty graph")
+
+        if fuse:
+            fused, groups = self._fused_graph(keep, targets)
+            result = await fused.arun(
+                use_cache,
+                free_intermediates,
+                keep,
+                targets,
+                timeout=timeout,
+                cancel_token=cancel_token,
+                profile_memory=profile_memory,
+            )
+            self._unfuse(result, groups)
+            return result
+
+        attributes = {
+            "foton.executor": "async",
+            "foton.nodes": len(self.nodes),
+            "foton.targets": list(targets or []),
+        }
+        with self._run_scope(cancel_token, timeout, profile_memory, attributes) as (
+            token,
+            run_span,
+        ):
+            state = self._start(
+                use_cache,
+                free_intermediates,
+                keep,
+                targets,
+                token=token,
+                run_span=run_span,
+            )
+            await self._arun_state(state)
+        return state.result()
+
+    async def _arun_state(self, state: _RunState) -> None:
+        """Drive ``state`` to completion on the running event loop."""
+        loop = asyncio.get_running_loop()
+        ready = deque(state.initial())
+        running: Dict["asyncio.Task[NodeOutput]", str] = {}
+
+        def cancel_tasks() -> None:
+            for task in running:
+                task.cancel()
+
+        def on_cancel() -> None:
+            # The token may be cancelled from any thread
+            loop.call_soon_threadsafe(cancel_tasks)
+
+        unregister = state.token.on_cancel(on_cancel)
+        try:
+            while running or ready:
+                while ready:
+                    node_name = ready.popleft()
+                    task = asyncio.ensure_future(state.aexecute(node_name))
+                    running[task] = node_name
+
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                state.token.raise_if_cancelled()
+                for task in done:
+                    node_name = running.pop(task)
+                    try:
+                        output = task.result()
+                    except Exception:
+                        state.token.cancel(f"Node '{node_name}' failed")
+                        raise
+                    ready.extend(state.complete(node_name, output))
+        except BaseException:
+            cancel_tasks()
+            # Let cancelled nodes clean up (e.g. cancel their fal requests)
+            await asyncio.gather(*running, return_exceptions=True)
+            state.finish(success=False)
+            raise
+        finally:
+            unregister()
+
+        state.finish(success=True)
+
+    def run_batch(
+        self,
+        inputs: Iterable[Any],
+        entry: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        use_cache: bool = True,
+        free_intermediates: bool = False,
+        keep: Optional[Iterable[str]] = None,
+        max_processes: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancelToken] = None,
+    ) -> Iterator["BatchResult"]:
+        """Run the graph over many inputs with stage-level pipelining.
+
+        See :func:`foton.batch.run_batch` for details.
+
+        Args:
+            inputs: Items to process. Each item is either a mapping of
+                ``"node.port"`` to value or a single value bound to ``entry``
+            entry: Port that receives non-mapping items, e.g. ``"load.path"``
+            max_workers: Number of worker threads shared by all items
+            max_in_flight: Maximum number of items being processed at once
+            use_cache: Reuse cached outputs of unchanged nodes
+            free_intermediates: Release intermediate outputs per item
+            keep: Nodes whose outputs survive ``free_intermediates``
+            max_processes: Run ``cpu_bound`` nodes in this many processes
+            timeout: Cancel the batch if it takes longer than this many seconds
+            cancel_token: Cancel the batch when this token is cancelled
+
+        Yields:
+            A BatchResult per item, in completion order
+        """
+        from .batch import run_batch
+
+        return run_batch(
+            self,
+            inputs,
+            entry=entry,
+            max_workers=max_workers,
+            max_in_flight=max_in_flight,
+            use_cache=use_cache,
+            free_intermediates=free_intermediates,
+            keep=keep,
+            max_processes=max_processes,
+            timeout=timeout,
+            cancel_token=cancel_token,
+        )
+
+    def stream(
+        self,
+        source: Iterable[Any],
+        entry: Optional[str] = None,
+        queue_size: int = 4,
+        queue_sizes: Optional[Dict[str, int]] = None,
+        on_error: str = "raise",
+        use_cache: bool = True,
+        free_intermediates: bool = False,
+        keep: Optional[Iterable[str]] = None,
+    ) -> "GraphStream":
+        """Process ``source`` as a stream, yielding results as items finish.
+
+        See :class:`foton.stream.GraphStream` for details.
+
+        Args:
+            source: Items to process. Each item is either a mapping of
+                ``"node.port"`` to value or a single value bound to ``entry``
+            entry: Port that receives non-mapping items, e.g. ``"load.path"``
+            queue_size: Default capacity of the queue on every edge
+            queue_sizes: Per-edge capacities keyed by ``"source->target"``
+            on_error: ``"raise"`` or ``"skip"`` failed items
+            use_cache: Reuse cached outputs of unchanged nodes
+            free_intermediates: Release intermediate outputs per item
+            keep: Nodes whose outputs survive ``free_intermediates``
+
+        Returns:
+            A GraphStream iterating over one ExecutionResult per item
+        """
+        from .stream import GraphStream
+
+        return GraphStream(
+            self,
+            source,
+            entry=entry,
+            queue_size=queue_size,
+            queue_sizes=queue_sizes,
+            on_error=on_error,
+            use_cache=use_cache,
+            free_intermediates=free_intermediates,
+            keep=keep,
+        )
+
+    @classmethod
+    def from_spec(
+        cls, spec: Union[Dict[str, Any], str, Path], **graph_kwargs: Any
+    ) -> "Graph":
+        """Build a graph from a spec or a JSON/YAML spec file.
+
+        The validated wires and compiled plan are cached by spec hash, so
+        loading the same spec again skips parsing and validation. See
+        :mod:`foton.spec` for the format.
+
+        Args:
+            spec: Spec mapping, or path of a spec file
+            **graph_kwargs: Passed to the constructor (cache, stats, tracer)
+        """
+        from .spec import build_graph
+
+        return build_graph(spec, **graph_kwargs)
+
+    def to_spec(self) -> Dict[str, Any]:
+        """Describe this graph as a spec that :meth:`from_spec` recreates."""
+        from .spec import graph_to_spec
 
-            # Propagate data from previous executions
-            if execution_outputs:
-                self._propagate_data(execution_outputs)
-
-            # Execute node
-            try:
-                output = node.execute(**node.inputs)
-                execution_outputs[node_name] = output
-            except Exception as e:
-                raise RuntimeError(
-                    f"Error executing node '{node_name}': {str(e)}"
-                ) from e
-
-        result = ExecutionResult(execution_outputs, execution_order)
-        self._execution_cache = result
-        return result
+        return graph_to_spec(self)
 
     def get_node(self, name: str) -> Optional[Node]:
         """Get a node by name."""
@@ -1,63 +1,468 @@
 """Image data structures and utilities."""
 
-from typing import Optional, Union, Any
+from typing import Callable, List, Optional, Tuple, Union, Any
+from io import BytesIO
 from pathlib import Path
+import os
+import re
+import shutil
+import tempfile
+import threading
 import numpy as np
 from PIL import Image as PILImage
 
+# Modes whose numpy array has the same bytes as the PIL image
+_ARRAY_MODES = {2: "L", 3: "RGB", 4: "RGBA"}
+
+# A header token of a PGM/PPM file, after any whitespace and comments
+_PNM_TOKEN = re.compile(rb"(?:\s|#[^\n]*\n)*([^\s#]+)")
+_PNM_CHANNELS = {b"P5": 1, b"P6": 3}
+
+# Pixels per strip when map_pixels works through a large image
+_STRIP_PIXELS = 1 << 22
+
 
 class Image:
-    """Represents an image in the EditGraph pipeline."""
-    
+    """Represents an image in the EditGraph pipeline.
+
+    An image is backed by a PIL image, a numpy array, or both. Whichever it
+    was created from is the source of truth and the other side is built on
+    first access and cached, so chains of nodes that compute in numpy never
+    convert to PIL until something (e.g. ``Export``) needs it.
+
+    Images created from a path or encoded bytes are lazy: :attr:`size` and
+    :attr:`mode` only read the file header, and the pixels are decoded on
+    first access. The file is closed as soon as it has been read.
+
+    Images created from a path or from encoded bytes also keep that original
+    encoding until their pixels may have changed (i.e. until :attr:`pil` is
+    handed out or replaced), so :meth:`save` to the same format and uploads
+    can reuse it verbatim instead of re-encoding.
+
+    Very large frames can be backed by a memory-mapped file instead (see
+    :meth:`open_memmap`), so their pixels live in the page cache rather than
+    on the heap.
+
+    :attr:`numpy` is always read-only; call :meth:`invalidate` after
+    modifying :attr:`pil` in place.
+    """
+
     def __init__(
         self,
-        data: Union[PILImage.Image, np.ndarray, str, Path],
-        metadata: Optional[dict] = None
+        data: Union[PILImage.Image, np.ndarray, str, Path, bytes],
+        metadata: Optional[dict] = None,
+        copy: bool = True,
     ) -> None:
         """Initialize an Image.
-        
+
         Args:
-            data: Image data as PIL Image, numpy array, or file path
+            data: Image data as PIL Image, numpy array, file path, or the
+                bytes of an encoded image file
             metadata: Optional metadata dictionary
+            copy: Copy a numpy array, so later changes to the caller's array
+                cannot alter the image. Pass False to hand the array over
+                instead, which must then not be modified. Memory-mapped
+                arrays are never copied.
         """
         self.metadata = metadata or {}
-        
+        self._path: Optional[Path] = None
+        # Encoded image file the image was created from, if not a path
+        self._encoded: Optional[bytes] = None
+        # Whether the file or encoded bytes still match the pixels
+        self._encoding_valid = False
+        # (size, mode, format) of a path or bytes backed image, read from the
+        # file header
+        self._header: Optional[Tuple[Tuple[int, int], str, Optional[str]]] = None
+        self._pil_image: Optional[PILImage.Image] = None
+        # Read-only pixels, either the source of truth or built from the PIL
+        # image on first access to numpy
+        self._array: Optional[np.ndarray] = None
+        # Serializes building the PIL image, so concurrent readers decode once
+        self._lock = threading.Lock()
+
         if isinstance(data, (str, Path)):
-            self._pil_image = PILImage.open(data)
+            self._path = Path(data)
+            self._encoding_valid = True
+        elif isinstance(data, (bytes, bytearray)):
+            self._encoded = bytes(data)
+            self._encoding_valid = True
         elif isinstance(data, PILImage.Image):
             self._pil_image = data
         elif isinstance(data, np.ndarray):
-            self._pil_image = PILImage.fromarray(data)
+            if copy and not isinstance(data, np.memmap):
+                array = np.array(data)
+            else:
+                array = data.view()
+            array.flags.writeable = False
+            self._array = array
         else:
             raise ValueError(f"Unsupported image data type: {type(data)}")
-    
+
     @property
     def pil(self) -> PILImage.Image:
-        """Get PIL Image representation."""
-        return self._pil_image
-    
+        """Get PIL Image representation.
+
+        Decoded from the file or built from the array on first access. Call
+        :meth:`invalidate` after modifying it in place. Since the returned
+        image can be modified, this also drops the original encoding (see
+        :attr:`encoded_format`); read pixels through :attr:`numpy` to keep it.
+        """
+        pil = self._decoded_pil()
+        self._drop_encoding()
+        return pil
+
+    @pil.setter
+    def pil(self, value: PILImage.Image) -> None:
+        self._pil_image = value
+        self._array = None
+        self._drop_encoding()
+
+    def _decoded_pil(self) -> PILImage.Image:
+        """The PIL image, built if needed, for read-only use inside the class."""
+        pil = self._pil_image
+        if pil is None:
+            with self._lock:
+                pil = self._pil_image
+                if pil is None:
+                    pil = self._build_pil()
+                    self._pil_image = pil
+        return pil
+
+    def _build_pil(self) -> PILImage.Image:
+        if self._array is not None:
+            return PILImage.fromarray(self._array)
+        with PILImage.open(self._source()) as pil:
+            # Decode fully, since the file is closed when the block exits
+            pil.load()
+        return pil
+
+    def _source(self) -> Union[Path, BytesIO]:
+        source = self._source_data()
+        return BytesIO(source) if isinstance(source, bytes) else source
+
     @property
     def numpy(self) -> np.ndarray:
-        """Get numpy array representation."""
-        return np.array(self._pil_image)
-    
+        """Get a read-only numpy array of the pixels.
+
+        The array is built once and shared by every access (and by copies of
+        the image). Use :meth:`numpy_copy` for an array you can modify.
+        """
+        array = self._array
+        if array is None:
+            # Wraps the bytes PIL exports without copying them again
+            array = np.asarray(self._decoded_pil())
+            array.flags.writeable = False
+            self._array = array
+        return array
+
+    def numpy_copy(self) -> np.ndarray:
+        """Get a writable copy of the pixels."""
+        return np.array(self.numpy)
+
+    def invalidate(self) -> None:
+        """Drop cached pixel data after the PIL image was modified in place.
+
+        This also drops the original encoding, which no longer matches.
+        """
+        if self._pil_image is not None:
+            self._array = None
+            self._drop_encoding()
+
+    def _drop_encoding(self) -> None:
+        self._encoding_valid = False
+        self._encoded = None
+
+    @property
+    def encoded_format(self) -> Optional[str]:
+        """PIL format name (e.g. ``"JPEG"``) of the original encoding.
+
+        None if the image was not created from a file or encoded bytes, or
+        its pixels have changed since.
+        """
+        if not self._encoding_valid:
+            return None
+        return self._read_header()[2]
+
+    def encoded_bytes(self) -> Optional[bytes]:
+        """Bytes of the original encoding, if it still matches the pixels."""
+        if not self._encoding_valid:
+            return None
+        source = self._source_data()
+        return source if isinstance(source, bytes) else source.read_bytes()
+
+    @property
+    def is_array_backed(self) -> bool:
+        """Whether the pixels currently exist only as a numpy array."""
+        return self._pil_image is None and self._array is not None
+
+    @property
+    def is_memmap(self) -> bool:
+        """Whether the pixels are a memory-mapped file."""
+        return isinstance(self._array, np.memmap)
+
+    @classmethod
+    def open_memmap(
+        cls, path: Union[str, Path], metadata: Optional[dict] = None
+    ) -> "Image":
+        """Create an image whose pixels are memory-mapped from ``path``.
+
+        Nothing is read up front: pages are loaded as nodes touch them and
+        can be evicted again under memory pressure.
+
+        Args:
+            path: A ``.npy`` file, or a binary 8-bit PGM/PPM file
+            metadata: Optional metadata dictionary
+
+        Raises:
+            ValueError: If the file is not in one of those formats
+        """
+        path = Path(path)
+        if path.suffix.lower() == ".npy":
+            array = np.load(path, mmap_mode="r")
+        else:
+            offset, shape = _pnm_layout(path)
+            array = np.memmap(
+                path, dtype=np.uint8, mode="r", offset=offset, shape=shape
+            )
+        return cls(array, metadata, copy=False)
+
+    @property
+    def is_decoded(self) -> bool:
+        """Whether the pixels are decoded (False for unread path images)."""
+        return self._pil_image is not None or self._array is not None
+
+    @property
+    def path(self) -> Optional[Path]:
+        """File the image was created from, if any."""
+        return self._path
+
+    def _read_header(self) -> Tuple[Tuple[int, int], str, Optional[str]]:
+        header = self._header
+        if header is None:
+            with PILImage.open(self._source()) as pil:
+                header = (pil.size, pil.mode, pil.format)
+            self._header = header
+        return header
+
+    def pixel_bytes(self) -> Union[bytes, memoryview]:
+        """Raw pixel data laid out as ``pil.tobytes()``, without a PIL round trip.
+
+        Used for hashing; the array is reused when it has the same layout.
+        """
+        array = self._array
+        if array is not None and self._array_mode(array) is not None:
+            return np.ascontiguousarray(array).data.cast("B")
+        return self._decoded_pil().tobytes()
+
+    @staticmethod
+    def _array_mode(array: np.ndarray) -> Optional[str]:
+        """PIL mode of a uint8 array, if PIL stores it byte for byte."""
+        if array.dtype != np.uint8:
+            return None
+        if array.ndim == 2:
+            return "L"
+        if array.ndim == 3 and array.shape[2] in (3, 4):
+            return _ARRAY_MODES[array.shape[2]]
+        return None
+
     @property
     def size(self) -> tuple[int, int]:
         """Get image size as (width, height)."""
-        return self._pil_image.size
-    
+        if self._pil_image is not None:
+            return self._pil_image.size
+        if self._array is not None:
+            height, width = self._array.shape[:2]
+            return width, height
+        return self._read_header()[0]
+
     @property
     def mode(self) -> str:
         """Get image mode (RGB, RGBA, etc.)."""
-        return self._pil_image.mode
-    
+        if self._pil_image is not None:
+            return self._pil_image.mode
+        if self._array is not None:
+            mode = self._array_mode(self._array)
+            if mode is not None:
+                return mode
+            return self._decoded_pil().mode
+        return self._read_header()[1]
+
     def save(self, path: Union[str, Path]) -> None:
-        """Save image to file."""
-        self._pil_image.save(path)
-    
+        """Save image to file.
+
+        If the extension of ``path`` maps to the format of the original
+        encoding, that encoding is written verbatim instead of re-encoding.
+        A ``.npy`` path stores the raw array, which :meth:`open_memmap` can
+        map back without decoding.
+        """
+        mapped = getattr(self._array, "filename", None)
+        if mapped is not None and _same_file(Path(mapped), path):
+            # Writing in place would truncate the file the pixels are mapped
+            # from while they are read, so write beside it and swap it in
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=".foton-", suffix=Path(path).suffix, dir=Path(path).parent
+            )
+            os.close(fd)
+            try:
+                self._write(tmp_path)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            return
+        self._write(path)
+
+    def _write(self, path: Union[str, Path]) -> None:
+        if Path(path).suffix.lower() == ".npy":
+            np.save(path, self.numpy)
+            return
+        fmt = self.encoded_format
+        if fmt is not None and _extension_format(path) == fmt:
+            source = self._source_data()
+            if isinstance(source, bytes):
+                Path(path).write_bytes(source)
+            elif not _same_file(source, path):
+                shutil.copyfile(source, path)
+            return
+        self._decoded_pil().save(path)
+
     def copy(self) -> "Image":
         """Create a copy of the image."""
-        return Image(self._pil_image.copy(), self.metadata.copy())
-    
+        if not self.is_decoded:
+            image = Image(self._source_data(), self.metadata.copy())
+            image._header = self._header
+            return image
+        if self._pil_image is None:
+            assert self._array is not None
+            # The array is read-only, so the copy can share it
+            image = Image(self._array, self.metadata.copy(), copy=False)
+        else:
+            image = Image(self._pil_image.copy(), self.metadata.copy())
+            image._array = self._array
+        if self._encoding_valid:
+            image._path = self._path
+            image._encoded = self._encoded
+            image._header = self._header
+            image._encoding_valid = True
+        return image
+
+    def _source_data(self) -> Union[Path, bytes]:
+        """The encoded bytes or file path the image was created from."""
+        if self._encoded is not None:
+            return self._encoded
+        assert self._path is not None
+        return self._path
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        # Only pickle the source of truth; the other side is rebuilt
+        if state["_encoded"] is not None:
+            state["_pil_image"] = None
+            state["_array"] = None
+        elif state["_pil_image"] is not None:
+            state["_array"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        if isinstance(self._array, np.memmap) and self._array.filename is None:
+            # Unpickled memmaps hold a copy of the pixels, not a mapping
+            self._array = np.asarray(self._array)
+        if self._array is not None:
+            self._array.flags.writeable = False
+
     def __repr__(self) -> str:
-        return f"Image(size={self.size}, mode={self.mode})"
\ No newline at end of file
+        return f"Image(size={self.size}, mode={self.mode})"
+
+
+def _extension_format(path: Union[str, Path]) -> Optional[str]:
+    """PIL format name that ``save`` would pick for ``path``."""
+    return PILImage.registered_extensions().get(Path(path).suffix.lower())
+
+
+def _same_file(source: Path, target: Union[str, Path]) -> bool:
+    try:
+        return source.samefile(target)
+    except OSError:
+        return False
+
+
+def _pnm_layout(path: Path) -> Tuple[int, Tuple[int, ...]]:
+    """Offset and array shape of the pixels of a binary 8-bit PGM/PPM file."""
+    with open(path, "rb") as f:
+        head = f.read(1024)
+    tokens: List[bytes] = []
+    pos = 0
+    while len(tokens) < 4:
+        match = _PNM_TOKEN.match(head, pos)
+        if match is None:
+            break
+        tokens.append(match.group(1))
+        pos = match.end()
+    if len(tokens) < 4 or tokens[0] not in _PNM_CHANNELS:
+        raise ValueError(
+            f"Cannot memory-map {path}: expected a .npy or binary PGM/PPM file"
+        )
+    magic, width, height, maxval = tokens
+    if maxval != b"255":
+        raise ValueError(f"Cannot memory-map {path}: only 8-bit PGM/PPM is supported")
+    shape: Tuple[int, ...] = (int(height), int(width))
+    if _PNM_CHANNELS[magic] > 1:
+        shape += (_PNM_CHANNELS[magic],)
+    # A single whitespace byte separates the header from the pixels
+    return pos + 1, shape
+
+
+def pixel_buffer(
+    shape: Tuple[int, ...], dtype: Any = np.uint8, memmap: bool = False
+) -> np.ndarray:
+    """Allocate an uninitialized pixel array for a node to write its result to.
+
+    Args:
+        shape: Array shape, e.g. ``(height, width, 3)``
+        dtype: Array dtype
+        memmap: Map the array to a temporary file instead of the heap. The
+            file is unlinked right away, so its space is released once the
+            array is garbage collected.
+    """
+    if not memmap:
+        return np.empty(shape, dtype=dtype)
+    fd, path = tempfile.mkstemp(prefix="foton-", suffix=".raw")
+    os.close(fd)
+    try:
+        return np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            # Mapped files cannot be removed on Windows; left to the OS
+            pass
+
+
+def map_pixels(image: Image, fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """Apply a pixel-wise transform to ``image`` and quantize the result.
+
+    ``fn`` receives float32 pixels in [0, 1] and returns them transformed.
+    Large images are processed in strips of rows, so the float32 working
+    copy never holds the whole frame, and memory-mapped images get a
+    memory-mapped result.
+
+    Returns:
+        A uint8 array of the transformed pixels
+    """
+    pixels = image.numpy
+    out = pixel_buffer(pixels.shape, np.uint8, memmap=image.is_memmap)
+    width = pixels.shape[1] if pixels.ndim > 1 else 1
+    rows = max(1, _STRIP_PIXELS // max(1, width))
+    for start in range(0, pixels.shape[0], rows):
+        strip = np.asarray(pixels[start : start + rows], dtype=np.float32) / 255.0
+        strip = fn(strip)
+        strip *= 255
+        # Assignment truncates like astype(np.uint8)
+        out[start : start + rows] = strip
+    return out
@@ -1,23 +1,216 @@
 """AI-powered image processing nodes."""
 
-from tkinter import W
-from typing import Any, List, Optional
-from io import BytesIO
-import tempfile
+import asyncio
+import base64
 import os
-import requests
-import numpy as np
-from PIL import Image as PILImage
 import re
-
-import base64
-from io import BytesIO
-from PIL import Image
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 import fal_client
+import httpx
+import requests
 
 from ..base import Node, NodeOutput
+from ..cancel import check_cancelled, current_token
+from ..events import QueueUpdate, RefinementStep, UploadDone, emit, listening
 from ..image import Image
+from ..profile import count_bytes
+from ..tracing import hash_text, span
+
+# Formats fal endpoints accept as uploaded, by their file extension
+_UPLOAD_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+
+@contextmanager
+def _image_file(image: Image) -> Iterator[str]:
+    """Yield the path of a file holding ``image``, ready to upload.
+
+    The original encoding of the image is reused when it still matches the
+    pixels: a file the image was loaded from is uploaded as is, and
+    downloaded bytes are written out unchanged. Anything else is encoded as
+    PNG. Temporary files are removed on exit.
+    """
+    fmt = image.encoded_format
+    if fmt in _UPLOAD_FORMATS and image.path is not None:
+        yield str(image.path)
+        return
+    suffix = _UPLOAD_FORMATS.get(fmt or "")
+    encoded = image.encoded_bytes() if suffix is not None else None
+    if encoded is None:
+        suffix = ".png"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp_path = tmp.name
+        if encoded is not None:
+            tmp.write(encoded)
+    try:
+        if encoded is None:
+            image.save(tmp_path)
+        yield tmp_path
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _upload_attributes(path: str, image: Image) -> Dict[str, Any]:
+    width, height = image.size
+    return {
+        "foton.upload.bytes": os.path.getsize(path),
+        "foton.upload.reencoded": image.encoded_format not in _UPLOAD_FORMATS,
+        "foton.image.width": width,
+        "foton.image.height": height,
+    }
+
+
+def _upload_image(image: Image) -> str:
+    """Upload ``image`` to fal storage."""
+    with _image_file(image) as path:
+        attributes = _upload_attributes(path, image)
+        with span("foton.upload", attributes):
+            url = fal_client.upload_file(path)
+    count_bytes(uploaded=attributes["foton.upload.bytes"])
+    emit(UploadDone, url=url, bytes=attributes["foton.upload.bytes"])
+    return url
+
+
+async def _upload_image_async(image: Image) -> str:
+    """Upload ``image`` to fal storage without blocking the event loop."""
+    with _image_file(image) as path:
+        attributes = _upload_attributes(path, image)
+        with span("foton.upload", attributes):
+            url = await fal_client.upload_file_async(path)
+    count_bytes(uploaded=attributes["foton.upload.bytes"])
+    emit(UploadDone, url=url, bytes=attributes["foton.upload.bytes"])
+    return url
+
+
+def _decode_download(content: bytes, current: Any) -> Image:
+    """Wrap a downloaded image as RGB and describe it on the span.
+
+    RGB downloads keep their bytes, so they are only decoded when their
+    pixels are needed and can be exported or uploaded again unchanged.
+    """
+    count_bytes(downloaded=len(content))
+    image = Image(content)
+    if image.mode != "RGB":
+        image = Image(image.pil.convert("RGB"))
+    width, height = image.size
+    current.set_attributes(
+        {
+            "foton.download.bytes": len(content),
+            "foton.image.width": width,
+            "foton.image.height": height,
+        }
+    )
+    return image
+
+
+def _download_image(url: str, timeout: float = 15) -> Image:
+    """Download an image as RGB."""
+    with span("foton.download", {"http.url": url}) as current:
+        resp = requests.get(url, timeout=timeout)
+        resp.raise_for_status()
+        return _decode_download(resp.content, current)
+
+
+async def _download_image_async(url: str, timeout: float = 15) -> Image:
+    """Download an image as RGB with an async HTTP client."""
+    with span("foton.download", {"http.url": url}) as current:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            resp = await client.get(url)
+            resp.raise_for_status()
+        return _decode_download(resp.content, current)
+
+
+def _publish_logs(update: Any) -> None:
+    """Publish the log lines of a fal queue update as QueueUpdate events."""
+    if not listening(QueueUpdate):
+        return
+    try:
+        if isinstance(update, fal_client.InProgress):
+            for log in update.logs:
+                msg = log.get("message")
+                if msg:
+                    emit(QueueUpdate, message=msg)
+    except Exception:
+        pass
+
+
+def _subscribe_attributes(
+    application: str, arguments: Dict[str, Any]
+) -> Dict[str, Any]:
+    attributes: Dict[str, Any] = {"fal.endpoint": application}
+    prompt = arguments.get("prompt")
+    if isinstance(prompt, str):
+        attributes["fal.prompt_hash"] = hash_text(prompt)
+    return attributes
+
+
+def _subscribe(
+    application: str,
+    arguments: Dict[str, Any],
+    with_logs: bool = False,
+    on_queue_update: Optional[Callable[[Any], None]] = None,
+) -> Any:
+    """Like ``fal_client.subscribe``, but cancellable.
+
+    If the current run is cancelled while the request is queued or running,
+    the fal request is cancelled too, so it stops consuming GPU time.
+    """
+    check_cancelled()
+    attributes = _subscribe_attributes(application, arguments)
+    with span("foton.subscribe", attributes) as current:
+        handle = fal_client.submit(application, arguments=arguments)
+        current.set_attribute("fal.request_id", getattr(handle, "request_id", None))
+        token = current_token()
+        unregister = token.on_cancel(handle.cancel) if token is not None else None
+        try:
+            for update in handle.iter_events(with_logs=with_logs):
+                check_cancelled()
+                if on_queue_update is not None:
+                    on_queue_update(update)
+            check_cancelled()
+            return handle.get()
+        except Exception:
+            # Report the cancellation rather than its fallout
+            check_cancelled()
+            raise
+        finally:
+            if unregister is not None:
+                unregister()
+
+
+async def _subscribe_async(
+    application: str,
+    arguments: Dict[str, Any],
+    with_logs: bool = False,
+    on_queue_update: Optional[Callable[[Any], None]] = None,
+) -> Any:
+    """Like ``fal_client.subscribe_async``, but cancellable.
+
+    Cancelling the awaiting task (as :meth:`foton.Graph.arun` does when the
+    run is cancelled) cancels the fal request before re-raising.
+    """
+    check_cancelled()
+    attributes = _subscribe_attributes(application, arguments)
+    with span("foton.subscribe", attributes) as current:
+        handle = await fal_client.submit_async(application, arguments=arguments)
+        current.set_attribute("fal.request_id", getattr(handle, "request_id", None))
+        try:
+            async for update in handle.iter_events(with_logs=with_logs):
+                if on_queue_update is not None:
+                    on_queue_update(update)
+            return await handle.get()
+        except asyncio.CancelledError:
+            try:
+                await handle.cancel()
+            except Exception:
+                # Best effort; the run is cancelled either way
+                pass
+            raise
 
 
 class Edit(Node):
@@ -32,22 +225,34 @@ class Edit(Node):
         prompt: str,
         image_urls: Optional[List[str]] = None,
         with_logs: bool = True,
+        download_timeout: float = 15,
         **kwargs: Any,
     ) -> None:
         super().__init__(**kwargs)
         self.prompt = prompt
         self.image_urls = image_urls or []
         self.with_logs = with_logs
+        self.download_timeout = download_timeout
+
+    def params(self) -> Dict[str, Any]:
+        params = super().params()
+        params.update({"prompt": self.prompt, "image_urls": self.image_urls})
+        return params
+
+    def spec_params(self) -> Dict[str, Any]:
+        params = super().spec_params()
+        params.update(
+            {
+                "prompt": self.prompt,
+                "image_urls": self.image_urls,
+                "with_logs": self.with_logs,
+                "download_timeout": self.download_timeout,
+            }
+        )
+        return params
 
     def _on_queue_update(self, update: Any) -> None:
-        try:
-            if isinstance(update, fal_client.InProgress):
-                for log in update.logs:
-                    msg = log.get("message")
-                    if msg:
-                        print(msg)
-        except Exception:
-            pass
+        _publish_logs(update)
 
     def _ensure_urls(self) -> List[str]:
         urls: List[str] = list(self.image_urls)
@@ -55,17 +260,7 @@ class Edit(Node):
         image = self.get_input("image")
         if image is not None and isinstance(image, Image):
             # Upload provided Image to fal storage
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                tmp_path = tmp.name
-            try:
-                image.pil.save(tmp_path)
-                uploaded_url = fal_client.upload_file(tmp_path)
-                urls.append(uploaded_url)
-            finally:
-                try:
-                    os.remove(tmp_path)
-                except OSError:
-                    pass
+            urls.append(_upload_image(image))
 
         if not urls:
             raise ValueError("No images provided. Supply an input Image or image_urls.")
@@ -106,15 +301,37 @@ class Edit(Node):
     def execute(self, **inputs: Any) -> NodeOutput:
         image = self.get_input("image")
 
-        # save image.pil which is a pil image
+        url = _upload_image(image)
+
+        result = _subscribe(
+            "fal-ai/nano-banana/edit",
+            arguments={"prompt": self.prompt, "image_urls": [url]},
+            with_logs=self.with_logs,
+            on_queue_update=self._on_queue_update,
+        )
+
+        image_url = result.get("images")[0].get("url")
+
+        result_image = _download_image(image_url, self.download_timeout)
+        result_image.metadata["source_url"] = image_url
+        result_image.metadata.update({"prompt": self.prompt, "model": "nano-banana"})
+
+        return NodeOutput(
+            data={"image": result_image},
+            metadata={
+                "endpoint": "fal-ai/nano-banana/edit",
+                "prompt": self.prompt,
+                "image_urls": [image_url],
+                "result_image_url": image_url,
+            },
+        )
 
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp_path = tmp.name
-        image.pil.save(tmp_path)
+    async def aexecute(self, **inputs: Any) -> NodeOutput:
+        image = self.get_input("image")
 
-        url = fal_client.upload_file(tmp_path)
+        url = await _upload_image_async(image)
 
-        result = fal_client.subscribe(
+        result = await _subscribe_async(
             "fal-ai/nano-banana/edit",
             arguments={"prompt": self.prompt, "image_urls": [url]},
             with_logs=self.with_logs,
@@ -123,12 +340,8 @@ class Edit(Node):
 
         image_url = result.get("images")[0].get("url")
 
-        print(image_url)
-
-        resp = requests.get(image_url, timeout=15)
-        resp.raise_for_status()
-        pil = PILImage.open(BytesIO(resp.content)).convert("RGB")
-        result_image = Image(pil, metadata={"source_url": image_url})
+        result_image = await _download_image_async(image_url, self.download_timeout)
+        result_image.metadata["source_url"] = image_url
         result_image.metadata.update({"prompt": self.prompt, "model": "nano-banana"})
 
         return NodeOutput(
@@ -155,6 +368,7 @@ class IterativeRefinement(Node):
         image_urls: Optional[List[str]] = None,
         with_logs: bool = True,
         steps: int = 10,
+        download_timeout: float = 15,
         **kwargs: Any,
     ) -> None:
         super().__init__(**kwargs)
@@ -162,16 +376,30 @@ class IterativeRefinement(Node):
         self.image_urls = image_urls or []
         self.with_logs = with_logs
         self.steps = steps
+        self.download_timeout = download_timeout
+
+    def params(self) -> Dict[str, Any]:
+        params = super().params()
+        params.update(
+            {"prompt": self.prompt, "image_urls": self.image_urls, "steps": self.steps}
+        )
+        return params
+
+    def spec_params(self) -> Dict[str, Any]:
+        params = super().spec_params()
+        params.update(
+            {
+                "prompt": self.prompt,
+                "image_urls": self.image_urls,
+                "with_logs": self.with_logs,
+                "steps": self.steps,
+                "download_timeout": self.download_timeout,
+            }
+        )
+        return params
 
     def _on_queue_update(self, update: Any) -> None:
-        try:
-            if isinstance(update, fal_client.InProgress):
-                for log in update.logs:
-                    msg = log.get("message")
-                    if msg:
-                        print(msg)
-        except Exception:
-            pass
+        _publish_logs(update)
 
     def _ensure_urls(self) -> List[str]:
         urls: List[str] = list(self.image_urls)
@@ -179,17 +407,7 @@ class IterativeRefinement(Node):
         image = self.get_input("image")
         if image is not None and isinstance(image, Image):
             # Upload provided Image to fal storage
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                tmp_path = tmp.name
-            try:
-                image.pil.save(tmp_path)
-                uploaded_url = fal_client.upload_file(tmp_path)
-                urls.append(uploaded_url)
-            finally:
-                try:
-                    os.remove(tmp_path)
-                except OSError:
-                    pass
+            urls.append(_upload_image(image))
 
         if not urls:
             raise ValueError("No images provided. Supply an input Image or image_urls.")
@@ -229,56 +447,105 @@ class IterativeRefinement(Node):
 
     def execute(self, **inputs: Any) -> NodeOutput:
         image = self.get_input("image")
+        # Refine a local copy so the node's configured prompt (and therefore
+        # its fingerprint) is unchanged by running it
+        prompt = self.prompt
 
-        # save image.pil which is a pil image
-        # loads temp image
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp_path = tmp.name
-        image.pil.save(tmp_path)
-
-        url = fal_client.upload_file(tmp_path)
+        url = _upload_image(image)
 
         for i in range(self.steps):
-            result = fal_client.subscribe(
+            check_cancelled()
+            result = _subscribe(
                 "fal-ai/nano-banana/edit",
-                arguments={"prompt": self.prompt, "image_urls": [url]},
+                arguments={"prompt": prompt, "image_urls": [url]},
                 with_logs=self.with_logs,
                 on_queue_update=self._on_queue_update,
             )
 
             image_url = result.get("images")[0].get("url")
 
-            print(image_url)
-
-            def on_queue_update(update):
-                if isinstance(update, fal_client.InProgress):
-                    for log in update.logs:
-                        print(log["message"])
-
-            result_prompt = fal_client.subscribe(
+            result_prompt = _subscribe(
                 "fal-ai/any-llm/vision",
                 arguments={
                     "image_url": image_url,
-                    "prompt": f"Given the prompt: {self.prompt}, check how close the prompt resembles the image, and improve the prompt for the next iteration to make it look like the orginal one. Only return the new prompt, no other text.",
+                    "prompt": f"Given the prompt: {prompt}, check how close the prompt resembles the image, and improve the prompt for the next iteration to make it look like the orginal one. Only return the new prompt, no other text.",
                 },
                 with_logs=True,
-                on_queue_update=on_queue_update,
+                on_queue_update=self._on_queue_update,
             )["output"]
-            print(result_prompt)
 
-            self.prompt = result_prompt
+            prompt = result_prompt
+            emit(
+                RefinementStep,
+                step=i + 1,
+                steps=self.steps,
+                image_url=image_url,
+                prompt=prompt,
+            )
 
-        resp = requests.get(image_url, timeout=15)
-        resp.raise_for_status()
-        pil = PILImage.open(BytesIO(resp.content)).convert("RGB")
-        result_image = Image(pil, metadata={"source_url": image_url})
-        result_image.metadata.update({"prompt": self.prompt, "model": "nano-banana"})
+        result_image = _download_image(image_url, self.download_timeout)
+        result_image.metadata["source_url"] = image_url
+        result_image.metadata.update({"prompt": prompt, "model": "nano-banana"})
 
         return NodeOutput(
             data={"image": result_image},
             metadata={
                 "endpoint": "fal-ai/nano-banana/edit",
-                "prompt": self.prompt,
+                "prompt": prompt,
+                "image_urls": [image_url],
+                "result_image_url": image_url,
+            },
+        )
+
+    async def aexecute(self, **inputs: Any) -> NodeOutput:
+        image = self.get_input("image")
+        # Refine a local copy so the node's configured prompt (and therefore
+        # its fingerprint) is unchanged by running it
+        prompt = self.prompt
+
+        url = await _upload_image_async(image)
+
+        for i in range(self.steps):
+            check_cancelled()
+            result = await _subscribe_async(
+                "fal-ai/nano-banana/edit",
+                arguments={"prompt": prompt, "image_urls": [url]},
+                with_logs=self.with_logs,
+                on_queue_update=self._on_queue_update,
+            )
+
+            image_url = result.get("images")[0].get("url")
+
+            result_prompt = (
+                await _subscribe_async(
+                    "fal-ai/any-llm/vision",
+                    arguments={
+                        "image_url": image_url,
+                        "prompt": f"Given the prompt: {prompt}, check how close the prompt resembles the image, and improve the prompt for the next iteration to make it look like the orginal one. Only return the new prompt, no other text.",
+                    },
+                    with_logs=True,
+                    on_queue_update=self._on_queue_update,
+                )
+            )["output"]
+
+            prompt = result_prompt
+            emit(
+                RefinementStep,
+                step=i + 1,
+                steps=self.steps,
+                image_url=image_url,
+                prompt=prompt,
+            )
+
+        result_image = await _download_image_async(image_url, self.download_timeout)
+        result_image.metadata["source_url"] = image_url
+        result_image.metadata.update({"prompt": prompt, "model": "nano-banana"})
+
+        return NodeOutput(
+            data={"image": result_image},
+            metadata={
+                "endpoint": "fal-ai/nano-banana/edit",
+                "prompt": prompt,
                 "image_urls": [image_url],
                 "result_image_url": image_url,
             },
@@ -1,16 +1,30 @@
 """Color processing nodes."""
 
-from typing import Any, Union
+from typing import Any, Dict, Union
 from pathlib import Path
 import numpy as np
-from PIL import Image as PILImage, ImageEnhance
+from PIL import ImageEnhance
 
 from ..base import Node, NodeOutput
-from ..image import Image
+from ..image import Image, map_pixels
+
+# ITU-R 601 luma weights, as used by PIL's "L" conversion
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Modes whose pixels apply_pixels can grade as an array
+_LUT_MODES = ("L", "RGB", "RGBA")
+
+
+def _has_rgb(pixels: np.ndarray) -> bool:
+    """Whether ``pixels`` has a channel axis holding at least R, G and B."""
+    return pixels.ndim == 3 and pixels.shape[-1] >= 3
 
 
 class ColorGrade(Node):
     """Color grading node with LUT support."""
+
+    cpu_bound = True
+    pixelwise = True
     
     def __init__(
         self, 
@@ -32,6 +46,22 @@ class ColorGrade(Node):
         
         if self.lut_path:
             self._load_lut()
+
+    def params(self) -> Dict[str, Any]:
+        params = super().params()
+        params.update({
+            "lut": str(self.lut_path) if self.lut_path else None,
+            "intensity": self.intensity
+        })
+        return params
+
+    def spec_params(self) -> Dict[str, Any]:
+        params = super().spec_params()
+        params.update({
+            "lut": str(self.lut_path) if self.lut_path else None,
+            "intensity": self.intensity
+        })
+        return params
     
     def _load_lut(self) -> None:
         """Load LUT data from .cube file."""
@@ -49,24 +79,50 @@ class ColorGrade(Node):
         if self._lut_data is None:
             return image
         
+        if image.mode not in _LUT_MODES:
+            raise ValueError(
+                f"ColorGrade with a LUT supports {', '.join(_LUT_MODES)} images, "
+                f"got {image.mode}"
+            )
         # Placeholder LUT application
         # In a real implementation, this would perform 3D LUT interpolation
-        img_array = np.array(image.pil, dtype=np.float32) / 255.0
-        
-        # Simple color grading effect (warm tone)
-        if self.lut_path and "Kodak" in str(self.lut_path):
-            img_array[:, :, 0] *= 1.1  # Slight red boost
-            img_array[:, :, 2] *= 0.95  # Slight blue reduction
-        
-        # Apply intensity
-        if self.intensity < 1.0:
-            original = np.array(image.pil, dtype=np.float32) / 255.0
-            img_array = original * (1 - self.intensity) + img_array * self.intensity
-        
-        img_array = np.clip(img_array * 255, 0, 255).astype(np.uint8)
-        result_pil = PILImage.fromarray(img_array, mode=image.mode)
-        
-        return Image(result_pil, metadata=image.metadata.copy())
+        return self._grade_pixels(image)
+
+    def _grade_pixels(self, image: Image) -> Image:
+        """Grade ``image`` with :meth:`apply_pixels`, keeping it in numpy."""
+        img_array = map_pixels(image, self.apply_pixels)
+        # Array-backed, so the next array-native node skips PIL entirely
+        return Image(img_array, metadata=image.metadata.copy(), copy=False)
+    
+    def apply_pixels(self, pixels: np.ndarray) -> np.ndarray:
+        """Grade float32 RGB pixels in [0, 1] and return the result.
+
+        This is the whole per-pixel transform, so chains of ColorGrade nodes
+        can be fused into a single pass (see ``Graph.run(fuse=True)``).
+        """
+        if self.lut_path is None:
+            # Equivalent of ImageEnhance.Color(1.2): move away from the grey
+            grey = (pixels[..., :3] @ _LUMA)[..., np.newaxis]
+            graded = grey + (pixels - grey) * 1.2
+        else:
+            graded = pixels.copy()
+            # Simple color grading effect (warm tone), on colour images only
+            if "Kodak" in str(self.lut_path) and _has_rgb(pixels):
+                graded[..., 0] *= 1.1  # Slight red boost
+                graded[..., 2] *= 0.95  # Slight blue reduction
+
+            # Apply intensity
+            if self.intensity < 1.0:
+                graded = pixels * (1 - self.intensity) + graded * self.intensity
+
+        return np.clip(graded, 0.0, 1.0, out=graded)
+
+    def pixel_metadata(self) -> Dict[str, Any]:
+        return {
+            "color_graded": True,
+            "lut": str(self.lut_path) if self.lut_path else None,
+            "intensity": self.intensity
+        }
     
     def execute(self, **inputs: Any) -> NodeOutput:
         """Apply color grading to input image.
@@ -87,17 +143,15 @@ class ColorGrade(Node):
         # Apply color grading
         if self.lut_path:
             result_image = self._apply_lut(image)
+        elif image.mode == "RGB":
+            result_image = self._grade_pixels(image)
         else:
             # Simple color enhancement without LUT
             enhancer = ImageEnhance.Color(image.pil)
             enhanced_pil = enhancer.enhance(1.2)  # Slight saturation boost
             result_image = Image(enhanced_pil, metadata=image.metadata.copy())
         
-        result_image.metadata.update({
-            "color_graded": True,
-            "lut": str(self.lut_path) if self.lut_path else None,
-            "intensity": self.intensity
-        })
+        result_image.metadata.update(self.pixel_metadata())
         
         return NodeOutput(
             data={"image": result_image},
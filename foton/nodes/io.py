@@ -1,7 +1,7 @@
 """Input/Output nodes for loading and saving images."""
 
 from pathlib import Path
-from typing import Any, Union, Optional
+from typing import Any, Dict, Union, Optional
 import json
 
 from ..base import Node, NodeOutput
@@ -11,35 +11,85 @@ from ..image import Image
 class Load(Node):
     """Node for loading images from file."""
 
-    def __init__(self, path: Union[str, Path], **kwargs: Any) -> None:
+    def __init__(
+        self, path: Union[str, Path, None] = None, mmap: bool = False, **kwargs: Any
+    ) -> None:
         """Initialize Load node.
 
         Args:
-            path: Path to image file
+            path: Path to image file. May be omitted if the path is supplied
+                through the ``path`` input instead (e.g. by ``Graph.run_batch``)
+            mmap: Memory-map the pixels instead of decoding them (see
+                :meth:`Image.open_memmap`). Requires a ``.npy`` or binary
+                8-bit PGM/PPM file; ``.npy`` files are always memory-mapped.
             **kwargs: Additional configuration
         """
         super().__init__(**kwargs)
-        self.path = Path(path)
+        self.path = Path(path) if path is not None else None
+        self.mmap = mmap
+
+    def _resolve_path(self) -> Optional[Path]:
+        """Return the ``path`` input if set, else the configured path."""
+        path = self.get_input("path", self.path)
+        return Path(path) if path is not None else None
+
+    def params(self) -> Dict[str, Any]:
+        params = super().params()
+        path = self._resolve_path()
+        params["path"] = str(path) if path else None
+        params["mmap"] = self.mmap
+        # Include the file's stat so edits on disk invalidate cached results
+        if path and path.exists():
+            stat = path.stat()
+            params["mtime_ns"] = stat.st_mtime_ns
+            params["file_size"] = stat.st_size
+        return params
+
+    def spec_params(self) -> Dict[str, Any]:
+        params = super().spec_params()
+        params["path"] = str(self.path) if self.path is not None else None
+        if self.mmap:
+            params["mmap"] = True
+        return params
 
     def execute(self, **inputs: Any) -> NodeOutput:
         """Load image from file.
 
+        Args:
+            path: Optional path overriding the configured one
+
         Returns:
             NodeOutput with 'image' key containing loaded Image
         """
-        if not self.path.exists():
-            raise FileNotFoundError(f"Image file not found: {self.path}")
-
-        image = Image(self.path)
+        path = self._resolve_path()
+        if path is None:
+            raise ValueError("No path provided for load")
+        if not path.exists():
+            raise FileNotFoundError(f"Image file not found: {path}")
+
+        if self.mmap or path.suffix.lower() == ".npy":
+            image = Image.open_memmap(path)
+        else:
+            # Lazy: only the header is read here (which also validates the
+            # file), and the pixels are decoded when a node first needs them
+            image = Image(path)
 
         return NodeOutput(
-            data={"image": image}, metadata={"source_path": str(self.path)}
+            data={"image": image},
+            metadata={
+                "source_path": str(path),
+                "size": image.size,
+                "mode": image.mode,
+            },
         )
 
 
 class Export(Node):
     """Node for exporting images to file."""
 
+    # Writing the file is the point of this node, so always re-run it
+    cacheable = False
+
     def __init__(
         self, path: Union[str, Path], embed_recipe: bool = False, **kwargs: Any
     ) -> None:
@@ -54,11 +104,26 @@ class Export(Node):
         self.path = Path(path)
         self.embed_recipe = embed_recipe
 
+    def params(self) -> Dict[str, Any]:
+        params = super().params()
+        params.update({"path": str(self.path), "embed_recipe": self.embed_recipe})
+        return params
+
+    def spec_params(self) -> Dict[str, Any]:
+        params = super().spec_params()
+        params.update({"path": str(self.path), "embed_recipe": self.embed_recipe})
+        return params
+
+    def _resolve_path(self) -> Path:
+        """Return the ``path`` input if set, else the configured path."""
+        return Path(self.get_input("path", self.path))
+
     def execute(self, **inputs: Any) -> NodeOutput:
         """Export image to file.
 
         Args:
             image: Image to export
+            path: Optional output path overriding the configured one
 
         Returns:
             NodeOutput with 'path' key containing output path
@@ -70,16 +135,19 @@ class Export(Node):
         if not isinstance(image, Image):
             raise TypeError(f"Expected Image, got {type(image)}")
 
+        path = self._resolve_path()
+
         # Ensure output directory exists
-        self.path.parent.mkdir(parents=True, exist_ok=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Save image
-        image.save(self.path)
+        # Save image; an unchanged image loaded from (or downloaded as) the
+        # same format is written back without re-encoding
+        image.save(path)
 
         # Optionally embed recipe in metadata file
-        metadata = {"output_path": str(self.path)}
+        metadata = {"output_path": str(path)}
         if self.embed_recipe:
-            recipe_path = self.path.with_suffix(self.path.suffix + ".recipe.json")
+            recipe_path = path.with_suffix(path.suffix + ".recipe.json")
             recipe_data = {
                 "image_metadata": image.metadata,
                 "processing_chain": "TODO: Add processing chain tracking",
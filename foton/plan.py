@@ -0,0 +1,163 @@
+"""Compiled execution plans for EditGraph."""
+
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple
+
+from .base import Wire
+
+
+class Binding(NamedTuple):
+    """A precomputed wire: where a source output is delivered."""
+
+    source_output: str
+    target_node: str
+    target_input: str
+
+
+class ExecutionPlan:
+    """Immutable, precomputed schedule for a graph.
+
+    A plan captures everything the executors need that depends only on the
+    graph topology: the topological order, the upstream and downstream
+    adjacency lists and the number of distinct dependencies of every node.
+    Plans are built once by :meth:`compile` and cached by the graph until its
+    structure changes.
+    """
+
+    def __init__(
+        self,
+        order: List[str],
+        dependencies: Dict[str, List[str]],
+        dependents: Dict[str, List[str]],
+        bindings: Dict[str, List[Binding]],
+    ) -> None:
+        self.order = order
+        self.dependencies = dependencies
+        self.dependents = dependents
+        self.bindings = bindings
+        self.in_degree = {node: len(deps) for node, deps in dependencies.items()}
+        # Number of distinct consumers of each node's outputs; an output is
+        # dead once this many consumers have finished
+        self.consumer_count = {node: len(deps) for node, deps in dependents.items()}
+        self.sinks = [node for node in order if not dependents[node]]
+        self._subplans: Dict[FrozenSet[str], "ExecutionPlan"] = {}
+
+    @classmethod
+    def compile(
+        cls, node_names: Iterable[str], wires: Iterable[Wire]
+    ) -> "ExecutionPlan":
+        """Build a plan from node names and wires in O(V + E).
+
+        Args:
+            node_names: Names of all nodes in the graph, in insertion order
+            wires: Connections between nodes
+
+        Returns:
+            The compiled ExecutionPlan
+
+        Raises:
+            ValueError: If a wire references an unknown node or the graph
+                contains a cycle
+        """
+        dependencies: Dict[str, List[str]] = {name: [] for name in node_names}
+        dependents: Dict[str, List[str]] = {name: [] for name in dependencies}
+        bindings: Dict[str, List[Binding]] = {name: [] for name in dependencies}
+        seen = set()
+
+        for wire in wires:
+            for node_name in (wire.source_node, wire.target_node):
+                if node_name not in dependencies:
+                    raise ValueError(
+                        f"Wire {wire} references unknown node '{node_name}'"
+                    )
+
+            bindings[wire.source_node].append(
+                Binding(wire.source_output, wire.target_node, wire.target_input)
+            )
+
+            edge = (wire.source_node, wire.target_node)
+            if edge in seen:
+                continue
+            seen.add(edge)
+            dependencies[wire.target_node].append(wire.source_node)
+            dependents[wire.source_node].append(wire.target_node)
+
+        # Kahn's algorithm over the adjacency lists
+        in_degree = {node: len(deps) for node, deps in dependencies.items()}
+        queue = deque(node for node, degree in in_degree.items() if degree == 0)
+        order: List[str] = []
+
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for target_node in dependents[node]:
+                in_degree[target_node] -= 1
+                if in_degree[target_node] == 0:
+                    queue.append(target_node)
+
+        if len(order) != len(dependencies):
+            raise ValueError("Circular dependency detected in graph")
+
+        return cls(order, dependencies, dependents, bindings)
+
+    def ancestors(self, targets: Iterable[str]) -> List[str]:
+        """Return ``targets`` and everything upstream of them, in plan order."""
+        closure = set()
+        stack = list(targets)
+        while stack:
+            node = stack.pop()
+            if node in closure:
+                continue
+            if node not in self.dependencies:
+                raise ValueError(f"Unknown target node '{node}'")
+            closure.add(node)
+            stack.extend(self.dependencies[node])
+        return [node for node in self.order if node in closure]
+
+    def subplan(self, targets: Iterable[str]) -> "ExecutionPlan":
+        """Return the plan pruned to the ancestor closure of ``targets``.
+
+        Subplans are cached on the plan, so asking for the same targets again
+        is a dictionary lookup.
+        """
+        key = frozenset(targets)
+        subplan = self._subplans.get(key)
+        if subplan is None:
+            order = self.ancestors(key)
+            keep = set(order)
+            subplan = ExecutionPlan(
+                order,
+                {node: self.dependencies[node] for node in order},
+                {
+                    node: [dep for dep in self.dependents[node] if dep in keep]
+                    for node in order
+                },
+                {
+                    node: [b for b in self.bindings[node] if b.target_node in keep]
+                    for node in order
+                },
+            )
+            self._subplans[key] = subplan
+        return subplan
+
+    def critical_path(self, costs: Dict[str, float]) -> Dict[str, float]:
+        """Return the longest remaining path from every node to a sink.
+
+        Args:
+            costs: Estimated execution time of every node in the plan
+
+        Returns:
+            For every node, its own cost plus the costliest chain of
+            dependents after it
+        """
+        remaining: Dict[str, float] = {}
+        for node in reversed(self.order):
+            after = max((remaining[dep] for dep in self.dependents[node]), default=0)
+            remaining[node] = costs[node] + after
+        return remaining
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __repr__(self) -> str:
+        return f"ExecutionPlan(nodes={len(self.order)})"
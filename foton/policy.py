@@ -0,0 +1,395 @@
+"""Retry, timeout and hedging policies for node execution."""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple, Type
+
+from .base import Node, NodeOutput
+from .cancel import CancelToken, RunCancelled, current_token
+
+
+@dataclass
+class Policy:
+    """How a node is executed: retries, timeouts and hedged requests.
+
+    Attach a policy to a node with ``Graph.add(name, node, policy=...)``.
+
+    Hedging targets tail latency: if an attempt has not finished after
+    ``hedge_after`` seconds (or, once enough runs have been observed, after
+    the ``hedge_quantile`` of the node's recent latencies), a duplicate is
+    started and whichever finishes first wins. The loser is cancelled, which
+    also cancels its queued fal request. Latencies are tracked per node, so
+    nodes sharing a policy do not share a hedge threshold.
+
+    Attributes:
+        max_attempts: Total attempts, including the first
+        backoff: Delay in seconds before the first retry
+        backoff_multiplier: Factor applied to the delay after every retry
+        max_backoff: Upper bound for the delay between retries
+        timeout: Seconds the node may take in total, across all attempts
+        attempt_timeout: Seconds a single attempt may take before it is
+            cancelled and retried
+        hedge_after: Seconds after which a duplicate attempt is started
+        hedge_quantile: Latency quantile (e.g. ``0.95``) used as the hedge
+            threshold once ``hedge_min_samples`` latencies have been recorded
+        hedge_min_samples: Observations needed before ``hedge_quantile``
+            is used
+        retry_on: Exception types that are retried; anything else fails
+            the node immediately
+    """
+
+    max_attempts: int = 1
+    backoff: float = 0.5
+    backoff_multiplier: float = 2.0
+    max_backoff: float = 30.0
+    timeout: Optional[float] = None
+    attempt_timeout: Optional[float] = None
+    hedge_after: Optional[float] = None
+    hedge_quantile: Optional[float] = None
+    hedge_min_samples: int = 20
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if self.hedge_quantile is not None and not 0 < self.hedge_quantile < 1:
+            raise ValueError("hedge_quantile must be between 0 and 1")
+
+    def hedge_delay(self, latencies: Optional["Latencies"] = None) -> Optional[float]:
+        """Seconds after which to start a duplicate attempt, if hedging.
+
+        Args:
+            latencies: Recent latencies of the node being executed
+        """
+        if self.hedge_quantile is not None and latencies is not None:
+            samples = latencies.samples()
+            if len(samples) >= self.hedge_min_samples:
+                index = int(len(samples) * self.hedge_quantile)
+                return samples[min(index, len(samples) - 1)]
+        return self.hedge_after
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff before attempt ``attempt + 1`` (attempts count from 1)."""
+        delay = self.backoff * self.backoff_multiplier ** (attempt - 1)
+        return min(delay, self.max_backoff)
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Whether a failed attempt is retried."""
+        if isinstance(error, RunCancelled) or attempt >= self.max_attempts:
+            return False
+        return isinstance(error, self.retry_on)
+
+    @property
+    def concurrent(self) -> bool:
+        """Whether attempts must run apart from the caller (timeouts, hedges)."""
+        return (
+            self.timeout is not None
+            or self.attempt_timeout is not None
+            or self.hedge_after is not None
+            or self.hedge_quantile is not None
+        )
+
+
+class Latencies:
+    """Recent successful attempt durations of one node, safe across threads."""
+
+    def __init__(self, maxlen: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Record the duration of a successful attempt."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def samples(self) -> List[float]:
+        """The recorded durations, sorted."""
+        with self._lock:
+            return sorted(self._samples)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+def _record(latencies: Optional[Latencies], seconds: float) -> None:
+    if latencies is not None:
+        latencies.record(seconds)
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _min_delay(*delays: Optional[float]) -> Optional[float]:
+    present = [delay for delay in delays if delay is not None]
+    return max(min(present), 0) if present else None
+
+
+def _spawn(fn: Callable[[], NodeOutput]) -> "Future[NodeOutput]":
+    """Run ``fn`` in a daemon thread with the caller's context."""
+    future: "Future[NodeOutput]" = Future()
+    context = contextvars.copy_context()
+
+    def target() -> None:
+        try:
+            result = context.run(fn)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    future.set_running_or_notify_cancel()
+    # Daemon, so an attempt that ignores cancellation cannot block exit
+    threading.Thread(target=target, name="foton-attempt", daemon=True).start()
+    return future
+
+
+def _attempt_sync(
+    policy: Policy,
+    node: Node,
+    run: Callable[[Node], NodeOutput],
+    deadline: Optional[float],
+    latencies: Optional[Latencies],
+) -> NodeOutput:
+    """Run one attempt (plus an optional hedge) in worker threads."""
+    parent = current_token()
+    started = time.monotonic()
+    attempt_deadline = None
+    if policy.attempt_timeout is not None:
+        attempt_deadline = started + policy.attempt_timeout
+    hedge_delay = policy.hedge_delay(latencies)
+
+    # Completed by the parent token so waiting wakes up on cancellation
+    cancelled: "Future[Any]" = Future()
+    unregister = None
+    if parent is not None:
+        unregister = parent.on_cancel(lambda: cancelled.set_result(None))
+
+    tokens: List[CancelToken] = []
+    running: List["Future[NodeOutput]"] = []
+
+    def launch() -> None:
+        token = CancelToken(parent=parent)
+        # Each attempt gets its own node, so attempts never share inputs
+        attempt = node.clone()
+
+        def execute() -> NodeOutput:
+            with token.activate():
+                return run(attempt)
+
+        tokens.append(token)
+        running.append(_spawn(execute))
+
+    error: Optional[BaseException] = None
+    try:
+        launch()
+        while running:
+            hedge_in = None
+            if hedge_delay is not None and len(tokens) == 1:
+                hedge_in = started + hedge_delay - time.monotonic()
+            done, _ = wait(
+                [*running, cancelled],
+                timeout=_min_delay(
+                    hedge_in, _remaining(attempt_deadline), _remaining(deadline)
+                ),
+                return_when=FIRST_COMPLETED,
+            )
+            if parent is not None:
+                parent.raise_if_cancelled()
+
+            for future in done:
+                running.remove(future)
+                if future.exception() is None:
+                    _record(latencies, time.monotonic() - started)
+                    output: NodeOutput = future.result()
+                    return output
+                if error is None:
+                    error = future.exception()
+
+            if not running:
+                break
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                raise TimeoutError(f"Timed out after {policy.timeout}s")
+            if attempt_deadline is not None and now >= attempt_deadline:
+                error = TimeoutError(
+                    f"Attempt timed out after {policy.attempt_timeout}s"
+                )
+                break
+            if hedge_in is not None and hedge_in <= 0:
+                launch()
+        assert error is not None
+        raise error
+    finally:
+        # Cancel the losers and anything still running
+        for token in tokens:
+            token.cancel("Attempt abandoned")
+            token.close()
+        if unregister is not None:
+            unregister()
+
+
+def execute_with_policy(
+    policy: Policy,
+    node: Node,
+    run: Callable[[Node], NodeOutput],
+    latencies: Optional[Latencies] = None,
+) -> NodeOutput:
+    """Execute ``node`` under ``policy``.
+
+    Args:
+        policy: Retry, timeout and hedging settings
+        node: Node with its inputs set
+        run: Executes a node (``node`` or a clone of it) once
+        latencies: Recent latencies of this node, used for and updated by
+            ``hedge_quantile``
+
+    Returns:
+        The output of the first successful attempt
+
+    Raises:
+        The error of the last attempt, TimeoutError if ``policy.timeout``
+        passes, or RunCancelled if the run is cancelled
+    """
+    token = current_token()
+    deadline = None
+    if policy.timeout is not None:
+        deadline = time.monotonic() + policy.timeout
+
+    attempt = 1
+    while True:
+        try:
+            if policy.concurrent:
+                return _attempt_sync(policy, node, run, deadline, latencies)
+            started = time.monotonic()
+            output = run(node)
+            _record(latencies, time.monotonic() - started)
+            return output
+        except Exception as e:
+            if not policy.should_retry(e, attempt):
+                raise
+            if deadline is not None and time.monotonic() >= deadline:
+                raise
+            delay = _min_delay(policy.retry_delay(attempt), _remaining(deadline))
+            if token is not None:
+                # Wakes up early if the run is cancelled during the backoff
+                if token.wait(delay):
+                    token.raise_if_cancelled()
+            else:
+                time.sleep(delay or 0)
+            attempt += 1
+
+
+async def _attempt_async(
+    policy: Policy,
+    node: Node,
+    run: Callable[[Node], Awaitable[NodeOutput]],
+    deadline: Optional[float],
+    latencies: Optional[Latencies],
+) -> NodeOutput:
+    """Async variant of :func:`_attempt_sync`; losers are cancelled tasks."""
+    started = time.monotonic()
+    attempt_deadline = None
+    if policy.attempt_timeout is not None:
+        attempt_deadline = started + policy.attempt_timeout
+    hedge_delay = policy.hedge_delay(latencies)
+
+    tasks: List["asyncio.Task[NodeOutput]"] = []
+    running: List["asyncio.Task[NodeOutput]"] = []
+
+    def launch() -> None:
+        task = asyncio.ensure_future(run(node.clone()))
+        tasks.append(task)
+        running.append(task)
+
+    error: Optional[BaseException] = None
+    try:
+        launch()
+        while running:
+            hedge_in = None
+            if hedge_delay is not None and len(tasks) == 1:
+                hedge_in = started + hedge_delay - time.monotonic()
+            done, _ = await asyncio.wait(
+                running,
+                timeout=_min_delay(
+                    hedge_in, _remaining(attempt_deadline), _remaining(deadline)
+                ),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+            for task in done:
+                running.remove(task)
+                if not task.cancelled() and task.exception() is None:
+                    _record(latencies, time.monotonic() - started)
+                    return task.result()
+                if error is None and not task.cancelled():
+                    error = task.exception()
+
+            if not running:
+                break
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                raise TimeoutError(f"Timed out after {policy.timeout}s")
+            if attempt_deadline is not None and now >= attempt_deadline:
+                error = TimeoutError(
+                    f"Attempt timed out after {policy.attempt_timeout}s"
+                )
+                break
+            if hedge_in is not None and hedge_in <= 0:
+                launch()
+        assert error is not None
+        raise error
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        # Let the losers cancel their remote requests
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def aexecute_with_policy(
+    policy: Policy,
+    node: Node,
+    run: Callable[[Node], Awaitable[NodeOutput]],
+    latencies: Optional[Latencies] = None,
+) -> NodeOutput:
+    """Async variant of :func:`execute_with_policy`.
+
+    Args:
+        policy: Retry, timeout and hedging settings
+        node: Node with its inputs set
+        run: Coroutine function executing a node (``node`` or a clone) once
+        latencies: Recent latencies of this node
+
+    Returns:
+        The output of the first successful attempt
+    """
+    deadline = None
+    if policy.timeout is not None:
+        deadline = time.monotonic() + policy.timeout
+
+    attempt = 1
+    while True:
+        try:
+            if policy.concurrent:
+                return await _attempt_async(policy, node, run, deadline, latencies)
+            started = time.monotonic()
+            output = await run(node)
+            _record(latencies, time.monotonic() - started)
+            return output
+        except Exception as e:
+            if not policy.should_retry(e, attempt):
+                raise
+            if deadline is not None and time.monotonic() >= deadline:
+                raise
+            delay = _min_delay(policy.retry_delay(attempt), _remaining(deadline))
+            await asyncio.sleep(delay or 0)
+            attempt += 1
@@ -0,0 +1,219 @@
+"""Running CPU-bound nodes in worker processes."""
+
+import multiprocessing
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .base import Node, NodeOutput
+from .image import Image
+
+# Modes that round-trip through a plain ndarray and PILImage.fromarray
+_SHAREABLE_MODES = {"L", "RGB", "RGBA", "I", "F"}
+
+
+class SharedImage:
+    """Picklable handle to an Image whose pixels live in shared memory.
+
+    Only the handle (segment name, array shape, dtype and metadata) crosses
+    the process boundary; the pixel buffer is written once by the sender, and
+    the worker reads it in place (see :meth:`attach`).
+    """
+
+    def __init__(
+        self, name: str, shape: Tuple[int, ...], dtype: str, metadata: dict
+    ) -> None:
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.metadata = metadata
+
+    @staticmethod
+    def supports(value: Any) -> bool:
+        """Whether ``value`` is an Image that can be shared."""
+        return isinstance(value, Image) and value.mode in _SHAREABLE_MODES
+
+    @classmethod
+    def create(cls, image: Image) -> Tuple["SharedImage", shared_memory.SharedMemory]:
+        """Copy ``image`` into a new shared memory segment.
+
+        Returns:
+            The handle and the segment, which the caller must close and
+            unlink once the receiver is done with it
+        """
+        array = image.numpy
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+        view[...] = array
+        handle = cls(segment.name, array.shape, array.dtype.str, image.metadata)
+        return handle, segment
+
+    def load(self, unlink: bool = False) -> Image:
+        """Copy the pixels out of shared memory into a new Image.
+
+        Args:
+            unlink: Also remove the segment (the receiver owns it)
+        """
+        segment = shared_memory.SharedMemory(name=self.name)
+        try:
+            view = np.ndarray(self.shape, dtype=self.dtype, buffer=segment.buf)
+            array = np.array(view)
+            del view
+        finally:
+            segment.close()
+            if unlink:
+                segment.unlink()
+        return Image(array, metadata=self.metadata, copy=False)
+
+    def attach(self, segment: shared_memory.SharedMemory) -> Image:
+        """Wrap the pixels in ``segment`` as a read-only Image, without copying.
+
+        The segment must stay open for as long as the image is in use.
+        """
+        view = np.ndarray(self.shape, dtype=self.dtype, buffer=segment.buf)
+        return Image(view, metadata=self.metadata, copy=False)
+
+    def discard(self) -> None:
+        """Remove the segment, if it still exists."""
+        try:
+            segment = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+        segment.close()
+        segment.unlink()
+
+
+def create_process_pool(max_processes: int) -> ProcessPoolExecutor:
+    """Create a process pool that is safe to use from worker threads.
+
+    Forking while executor threads hold locks can deadlock the child, so
+    workers are started with ``forkserver`` where available, else ``spawn``.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return ProcessPoolExecutor(
+        max_processes, mp_context=multiprocessing.get_context(method)
+    )
+
+
+def _share(
+    data: Dict[str, Any], segments: List[shared_memory.SharedMemory]
+) -> Dict[str, Any]:
+    """Replace shareable Images in ``data`` with SharedImage handles."""
+    shared = {}
+    for key, value in data.items():
+        if SharedImage.supports(value):
+            handle, segment = SharedImage.create(value)
+            segments.append(segment)
+            shared[key] = handle
+        else:
+            shared[key] = value
+    return shared
+
+
+def _unshare(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace SharedImage handles in ``data`` with Images, removing segments.
+
+    Every segment is removed, even if copying one of them out fails.
+    """
+    try:
+        return {
+            key: value.load(unlink=True) if isinstance(value, SharedImage) else value
+            for key, value in data.items()
+        }
+    finally:
+        for value in data.values():
+            if isinstance(value, SharedImage):
+                value.discard()
+
+
+@contextmanager
+def _attached(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Replace SharedImage handles in ``data`` with Images over the segments.
+
+    The segments stay mapped until the block exits; the caller must drop its
+    references to the images by then.
+    """
+    segments: List[shared_memory.SharedMemory] = []
+    attached = {}
+    try:
+        for key, value in data.items():
+            if isinstance(value, SharedImage):
+                segment = shared_memory.SharedMemory(name=value.name)
+                segments.append(segment)
+                attached[key] = value.attach(segment)
+            else:
+                attached[key] = value
+        yield attached
+    finally:
+        attached.clear()
+        for segment in segments:
+            try:
+                segment.close()
+            except BufferError:
+                # The node kept a reference to its input; the mapping goes
+                # away when that is collected
+                pass
+
+
+def _execute_shared(
+    node: Node, inputs: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Worker-side entry point: run ``node`` on shared inputs.
+
+    Input images are read straight from the parent's segments. Output images
+    are written to new segments that the parent unlinks.
+    """
+    with _attached(inputs) as attached:
+        node.inputs = attached
+        try:
+            output = node.execute(**node.inputs)
+        finally:
+            node.inputs = {}
+        segments: List[shared_memory.SharedMemory] = []
+        try:
+            data = _share(output.data, segments)
+            metadata = output.metadata
+            del output
+            # The pool pickles the result after this returns, too late to
+            # remove the segments if that fails, so make sure it can
+            pickle.dumps((data, metadata))
+        except BaseException:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+            raise
+    for segment in segments:
+        segment.close()
+    return data, metadata
+
+
+def execute_in_process(pool: Executor, node: Node) -> NodeOutput:
+    """Execute ``node`` in a worker process of ``pool``.
+
+    Image inputs and outputs are handed over through shared memory instead
+    of being pickled; everything else (including the node itself, without its
+    inputs) is pickled as usual.
+
+    Args:
+        pool: Process pool to run the node in
+        node: Node with its inputs set
+
+    Returns:
+        The node's output, with images copied back into this process
+    """
+    segments: List[shared_memory.SharedMemory] = []
+    try:
+        inputs = _share(node.inputs, segments)
+        payload = node.clone()
+        payload.inputs = {}
+        data, metadata = pool.submit(_execute_shared, payload, inputs).result()
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+    return NodeOutput(data=_unshare(data), metadata=metadata)
@@ -0,0 +1,222 @@
+"""Per-node timing and resource profiles of graph runs."""
+
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# Guards the byte counters, which hedged attempts update from several threads
+_bytes_lock = threading.Lock()
+
+# The tracemalloc peak is process-wide, so it can only be attributed to a node
+# that ran alone. Maps the id of each profile being measured while tracing to
+# whether another node overlapped it.
+_memory_lock = threading.Lock()
+_overlapped: Dict[int, bool] = {}
+
+
+@dataclass
+class NodeProfile:
+    """Where one node's time and resources went.
+
+    Times are in seconds; ``start`` is relative to the start of the run.
+
+    Attributes:
+        node: Node name
+        node_type: Node class
+        start: When the node started executing
+        wall: Wall-clock duration
+        cpu: CPU time of the executing thread (None for async execution,
+            where the event loop thread is shared with other nodes)
+        queue_wait: Time between the node becoming ready and starting
+        peak_memory: Peak traced memory above the node's starting point, in
+            bytes. Only recorded while :mod:`tracemalloc` is tracing, and
+            only for nodes that did not overlap another node (the peak is
+            process-wide); None otherwise.
+        bytes_uploaded: Bytes sent to remote services
+        bytes_downloaded: Bytes received from remote services
+        cached: Whether the output was reused instead of executing
+        thread: Identifier of the thread the node ran on
+    """
+
+    node: str
+    node_type: str
+    start: float = 0.0
+    wall: float = 0.0
+    cpu: Optional[float] = None
+    queue_wait: float = 0.0
+    peak_memory: Optional[int] = None
+    bytes_uploaded: int = 0
+    bytes_downloaded: int = 0
+    cached: bool = False
+    thread: int = 0
+
+    def add_bytes(self, uploaded: int = 0, downloaded: int = 0) -> None:
+        """Count transferred bytes (safe to call from attempt threads)."""
+        with _bytes_lock:
+            self.bytes_uploaded += uploaded
+            self.bytes_downloaded += downloaded
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+_current: ContextVar[Optional[NodeProfile]] = ContextVar(
+    "foton_node_profile", default=None
+)
+
+
+def count_bytes(uploaded: int = 0, downloaded: int = 0) -> None:
+    """Attribute transferred bytes to the node currently executing.
+
+    Nodes that talk to remote services call this after every transfer. It
+    does nothing outside a profiled run.
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.add_bytes(uploaded, downloaded)
+
+
+@contextmanager
+def measure(
+    profile: NodeProfile, run_start: float, cpu: bool = True
+) -> Iterator[NodeProfile]:
+    """Fill in ``profile`` with the timings of the enclosed block.
+
+    Args:
+        profile: Profile to fill in; it becomes the target of
+            :func:`count_bytes` inside the block
+        run_start: ``time.perf_counter()`` at the start of the run
+        cpu: Also measure the CPU time of the current thread
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        with _memory_lock:
+            if _overlapped:
+                for key in _overlapped:
+                    _overlapped[key] = True
+                _overlapped[id(profile)] = True
+            else:
+                _overlapped[id(profile)] = False
+                baseline = tracemalloc.get_traced_memory()[0]
+                if hasattr(tracemalloc, "reset_peak"):
+                    tracemalloc.reset_peak()
+    cpu_start = time.thread_time() if cpu else 0.0
+    started = time.perf_counter()
+    profile.start = started - run_start
+    profile.thread = threading.get_ident()
+    reset = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(reset)
+        profile.wall = time.perf_counter() - started
+        if cpu:
+            profile.cpu = time.thread_time() - cpu_start
+        if tracing:
+            with _memory_lock:
+                overlapped = _overlapped.pop(id(profile))
+                if not overlapped and tracemalloc.is_tracing():
+                    peak = tracemalloc.get_traced_memory()[1]
+                    profile.peak_memory = max(peak - baseline, 0)
+
+
+@contextmanager
+def trace_memory(enabled: bool) -> Iterator[None]:
+    """Run the enclosed block with :mod:`tracemalloc` tracing if ``enabled``.
+
+    Tracing that was already started by the caller is left running.
+    """
+    start = enabled and not tracemalloc.is_tracing()
+    if start:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if start:
+            tracemalloc.stop()
+
+
+class RunProfile:
+    """Profiles of every node a run executed or reused, in start order."""
+
+    def __init__(self, nodes: List[NodeProfile], wall: float) -> None:
+        self.nodes = sorted(nodes, key=lambda profile: profile.start)
+        self.wall = wall
+        self._by_name = {profile.node: profile for profile in self.nodes}
+
+    def __getitem__(self, node_name: str) -> NodeProfile:
+        return self._by_name[node_name]
+
+    def __iter__(self) -> Iterator[NodeProfile]:
+        return iter(self.nodes)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Return the run in Chrome trace-event format.
+
+        Every node is a complete event on the track of the thread it ran on,
+        and its queue wait is an async event on a separate "queue" track. The
+        result can be opened in Perfetto or ``chrome://tracing``.
+        """
+        tracks: Dict[int, int] = {}
+        events: List[Dict[str, Any]] = []
+        for profile in self.nodes:
+            tid = tracks.setdefault(profile.thread, len(tracks) + 1)
+            args = profile.to_dict()
+            for key in ("node", "node_type", "start", "wall", "thread"):
+                args.pop(key)
+            events.append(
+                {
+                    "name": profile.node,
+                    "cat": profile.node_type,
+                    "ph": "X",
+                    "ts": profile.start * 1e6,
+                    "dur": profile.wall * 1e6,
+                    "pid": 1,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+            if profile.queue_wait > 0:
+                # Async events, since waits of different nodes overlap
+                wait = {
+                    "name": f"wait {profile.node}",
+                    "cat": "queue",
+                    "id": len(events),
+                    "pid": 1,
+                    "tid": 0,
+                }
+                start = profile.start - profile.queue_wait
+                events.append({**wait, "ph": "b", "ts": start * 1e6})
+                events.append({**wait, "ph": "e", "ts": profile.start * 1e6})
+
+        names = [(0, "queue")] + [
+            (tid, f"worker {tid}") for tid in sorted(tracks.values())
+        ]
+        for tid, name in names:
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: Union[str, Path]) -> None:
+        """Write :meth:`to_chrome_trace` to ``path`` as JSON."""
+        with open(Path(path).expanduser(), "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def __repr__(self) -> str:
+        return f"RunProfile(nodes={len(self.nodes)}, wall={self.wall:.3f}s)"
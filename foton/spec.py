@@ -0,0 +1,321 @@
+"""Serializable graph definitions.
+
+A spec describes a graph as plain data, so it can be stored as JSON or YAML
+and shipped to remote workers::
+
+    {
+        "version": 1,
+        "nodes": {
+            "load": {"type": "Load", "params": {"path": "in.png"}},
+            "edit": {
+                "type": "Edit",
+                "params": {"prompt": "make him an astronaut"},
+                "policy": {"max_attempts": 3, "attempt_timeout": 120}
+            },
+            "export": {"type": "Export", "params": {"path": "out.png"}}
+        },
+        "wires": ["load.image -> edit.image", "edit.image -> export.image"]
+    }
+
+Node types are resolved through a registry (see :func:`register_node`)
+rather than imported by name, so a spec can only instantiate known nodes.
+The validated wires and compiled plan of every spec are cached by the hash
+of the spec, so loading the same spec again only constructs its nodes.
+"""
+
+import builtins
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import fields
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from .base import Node, Wire
+from .nodes import ColorGrade, Edit, Export, IterativeRefinement, Load
+from .plan import ExecutionPlan
+from .policy import Policy
+
+if TYPE_CHECKING:
+    from .graph import Graph
+
+SPEC_VERSION = 1
+
+N = TypeVar("N", bound=Type[Node])
+
+_registry: Dict[str, Type[Node]] = {}
+_registry_lock = threading.Lock()
+
+
+def register_node(
+    cls: Optional[N] = None, *, name: Optional[str] = None
+) -> Union[N, Callable[[N], N]]:
+    """Make a node class available to specs under ``name``.
+
+    Usable as a decorator, with or without arguments::
+
+        @register_node
+        class Sharpen(Node): ...
+
+        @register_node(name="acme.Sharpen")
+        class Sharpen(Node): ...
+
+    Args:
+        cls: Node class to register
+        name: Type name used in specs. Defaults to the class name.
+
+    Raises:
+        ValueError: If another class is already registered under ``name``
+    """
+
+    def register(node_cls: N) -> N:
+        type_name = name or node_cls.__name__
+        with _registry_lock:
+            existing = _registry.get(type_name)
+            if existing is not None and existing is not node_cls:
+                raise ValueError(
+                    f"Node type '{type_name}' is already registered to {existing}"
+                )
+            _registry[type_name] = node_cls
+        return node_cls
+
+    if cls is None:
+        return register
+    return register(cls)
+
+
+for _builtin in (Load, Export, Edit, IterativeRefinement, ColorGrade):
+    register_node(_builtin)
+
+
+def node_class(type_name: str) -> Type[Node]:
+    """Return the node class registered under ``type_name``."""
+    try:
+        return _registry[type_name]
+    except KeyError:
+        raise ValueError(f"Unknown node type '{type_name}'") from None
+
+
+def type_name(node: Node) -> str:
+    """Return the name ``node``'s class is registered under."""
+    with _registry_lock:
+        for name, cls in _registry.items():
+            if cls is type(node):
+                return name
+    raise ValueError(
+        f"Node class {type(node).__name__} is not registered; "
+        "decorate it with foton.spec.register_node"
+    )
+
+
+def spec_hash(spec: Mapping[str, Any]) -> str:
+    """Stable hash of a spec, independent of key order."""
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _parse_wires(wires: Any) -> List[Wire]:
+    """Validate and parse the ``wires`` section (as :meth:`Graph.wire`)."""
+    if not isinstance(wires, list):
+        raise ValueError("Spec 'wires' must be a list of connection strings")
+    parsed = []
+    for connection in wires:
+        if not isinstance(connection, str) or "->" not in connection:
+            raise ValueError(f"Invalid connection format: {connection!r}")
+        source, target = (part.strip() for part in connection.split("->", 1))
+        for src in source.split(","):
+            parsed.append(Wire(src.strip(), target))
+    return parsed
+
+
+def _validate_nodes(nodes: Any) -> None:
+    if not isinstance(nodes, dict) or not nodes:
+        raise ValueError("Spec 'nodes' must be a non-empty mapping of name to node")
+    for name, entry in nodes.items():
+        if not isinstance(entry, dict) or "type" not in entry:
+            raise ValueError(f"Spec node '{name}' must be a mapping with a 'type'")
+        unknown = set(entry).difference({"type", "params", "policy"})
+        if unknown:
+            raise ValueError(f"Spec node '{name}' has unknown keys: {sorted(unknown)}")
+        node_class(entry["type"])
+        if not isinstance(entry.get("params", {}), dict):
+            raise ValueError(f"Spec node '{name}' params must be a mapping")
+        if not isinstance(entry.get("policy", {}), dict):
+            raise ValueError(f"Spec node '{name}' policy must be a mapping")
+
+
+def _policy_from_spec(entry: Dict[str, Any]) -> Policy:
+    entry = dict(entry)
+    retry_on = entry.pop("retry_on", None)
+    if retry_on is not None:
+        classes = []
+        for name in retry_on:
+            cls = getattr(builtins, name, None)
+            if not (isinstance(cls, type) and issubclass(cls, BaseException)):
+                raise ValueError(f"retry_on must name builtin exceptions: {name!r}")
+            classes.append(cls)
+        entry["retry_on"] = tuple(classes)
+    try:
+        return Policy(**entry)
+    except TypeError as e:
+        raise ValueError(f"Invalid policy: {e}") from e
+
+
+def _policy_to_spec(policy: Policy) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {}
+    for f in fields(policy):
+        value = getattr(policy, f.name)
+        if value == f.default:
+            continue
+        if f.name == "retry_on":
+            for cls in value:
+                if getattr(builtins, cls.__name__, None) is not cls:
+                    raise ValueError(
+                        f"Cannot serialize retry_on={cls.__name__}: "
+                        "only builtin exceptions are supported"
+                    )
+            value = [cls.__name__ for cls in value]
+        entry[f.name] = value
+    return entry
+
+
+# Validated wires and compiled plan of recently loaded specs, by spec hash
+_compiled: "OrderedDict[str, Tuple[List[Wire], ExecutionPlan]]" = OrderedDict()
+_compiled_lock = threading.Lock()
+_COMPILED_MAX = 256
+
+
+def _compile_spec(
+    key: str, spec: Mapping[str, Any]
+) -> Tuple[List[Wire], ExecutionPlan]:
+    """Validate ``spec`` and compile its plan, or return the cached result."""
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    version = spec.get("version", SPEC_VERSION)
+    if version != SPEC_VERSION:
+        raise ValueError(f"Unsupported spec version: {version}")
+    unknown = set(spec).difference({"version", "nodes", "wires"})
+    if unknown:
+        raise ValueError(f"Spec has unknown keys: {sorted(unknown)}")
+    _validate_nodes(spec.get("nodes"))
+    wires = _parse_wires(spec.get("wires", []))
+    plan = ExecutionPlan.compile(spec["nodes"], wires)
+
+    with _compiled_lock:
+        _compiled[key] = (wires, plan)
+        while len(_compiled) > _COMPILED_MAX:
+            _compiled.popitem(last=False)
+    return wires, plan
+
+
+def load_spec(path: Union[str, Path]) -> Dict[str, Any]:
+    """Read a spec from a ``.json``, ``.yaml`` or ``.yml`` file.
+
+    YAML requires PyYAML.
+    """
+    path = Path(path).expanduser()
+    text = path.read_text()
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError(
+                "Loading YAML specs requires PyYAML: pip install pyyaml"
+            ) from e
+        spec = yaml.safe_load(text)
+    else:
+        spec = json.loads(text)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Spec in {path} must be a mapping")
+    return spec
+
+
+def save_spec(spec: Mapping[str, Any], path: Union[str, Path]) -> None:
+    """Write ``spec`` to ``path`` as JSON, or YAML for ``.yaml``/``.yml``."""
+    path = Path(path).expanduser()
+    if path.suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError(
+                "Saving YAML specs requires PyYAML: pip install pyyaml"
+            ) from e
+        path.write_text(yaml.safe_dump(dict(spec), sort_keys=False))
+    else:
+        path.write_text(json.dumps(spec, indent=2) + "\n")
+
+
+def build_graph(
+    spec: Union[Mapping[str, Any], str, Path], **graph_kwargs: Any
+) -> "Graph":
+    """Build a graph from a spec or a spec file.
+
+    Args:
+        spec: Spec mapping, or path of a JSON/YAML spec file
+        **graph_kwargs: Passed to :class:`~foton.graph.Graph` (cache, stats,
+            tracer)
+
+    Raises:
+        ValueError: If the spec is malformed, names an unknown node type or
+            describes a cyclic graph
+    """
+    from .graph import Graph
+
+    if isinstance(spec, (str, Path)):
+        spec = load_spec(spec)
+    key = spec_hash(spec)
+    wires, plan = _compile_spec(key, spec)
+
+    graph = Graph(**graph_kwargs)
+    for name, entry in spec["nodes"].items():
+        cls = node_class(entry["type"])
+        try:
+            node = cls(**entry.get("params", {}))
+        except TypeError as e:
+            raise ValueError(f"Invalid params for node '{name}': {e}") from e
+        policy = entry.get("policy")
+        graph.add(name, node, _policy_from_spec(policy) if policy else None)
+    graph.wires = list(wires)
+    graph._plan = plan
+    graph.spec_hash = key
+    return graph
+
+
+def graph_to_spec(graph: "Graph") -> Dict[str, Any]:
+    """Describe ``graph`` as a spec that :func:`build_graph` recreates.
+
+    Raises:
+        ValueError: If a node class is not registered or a policy cannot be
+            serialized
+    """
+    nodes: Dict[str, Any] = {}
+    for name, node in graph.nodes.items():
+        entry: Dict[str, Any] = {"type": type_name(node)}
+        params = node.spec_params()
+        if params:
+            entry["params"] = params
+        if node.policy is not None:
+            entry["policy"] = _policy_to_spec(node.policy)
+        nodes[name] = entry
+    return {
+        "version": SPEC_VERSION,
+        "nodes": nodes,
+        "wires": [f"{wire.source} -> {wire.target}" for wire in graph.wires],
+    }
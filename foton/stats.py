@@ -0,0 +1,103 @@
+"""Historical node execution times for scheduling."""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .base import Node
+
+
+def node_type(node: Node) -> str:
+    """Key under which timings of ``node`` are recorded (its class)."""
+    return f"{type(node).__module__}.{type(node).__qualname__}"
+
+
+class TimingStats:
+    """Per-node-type execution times, optionally persisted to a JSON file.
+
+    Every executed (not cached) node records its wall time under its class,
+    and the estimate for a class is an exponential moving average of those
+    times, so ``Edit`` converges to seconds and ``ColorGrade`` to
+    milliseconds. The threaded executor uses the estimates to run the nodes
+    on the longest remaining path first.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        default: float = 1.0,
+        smoothing: float = 0.3,
+    ) -> None:
+        """Initialize the store.
+
+        Args:
+            path: JSON file to load timings from and save them to. Without
+                a path timings are kept in memory only.
+            default: Estimate in seconds for node types never timed
+            smoothing: Weight of the newest sample in the moving average
+        """
+        self.path = Path(path).expanduser() if path is not None else None
+        self.default = default
+        self.smoothing = smoothing
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self._timings = json.load(f)
+            except (OSError, ValueError):
+                # A corrupt store only costs us the history
+                self._timings = {}
+
+    def record(self, node: Node, seconds: float) -> None:
+        """Record that ``node`` took ``seconds`` to execute."""
+        key = node_type(node)
+        with self._lock:
+            entry = self._timings.get(key)
+            if entry is None:
+                self._timings[key] = {"mean": seconds, "count": 1}
+            else:
+                entry["mean"] += self.smoothing * (seconds - entry["mean"])
+                entry["count"] += 1
+            self._dirty = True
+
+    def estimate(self, node: Node) -> float:
+        """Expected execution time of ``node`` in seconds."""
+        with self._lock:
+            entry = self._timings.get(node_type(node))
+        return entry["mean"] if entry is not None else self.default
+
+    def save(self) -> None:
+        """Write the timings to ``path`` if they changed since the last save.
+
+        The file is replaced atomically, so concurrent processes sharing it
+        never read a partial file (the last writer wins).
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._timings, indent=2, sort_keys=True)
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def as_dict(self) -> Dict[str, float]:
+        """Current estimate per node type."""
+        with self._lock:
+            return {key: entry["mean"] for key, entry in self._timings.items()}
+
+    def __repr__(self) -> str:
+        return f"TimingStats(types={len(self._timings)}, path={self.path})"
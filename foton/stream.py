@@ -0,0 +1,305 @@
+"""Streaming execution of a graph with bounded queues between nodes."""
+
+import queue
+import threading
+import weakref
+from contextlib import ExitStack
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .batch import bind_inputs
+from .graph import ExecutionResult, Graph, _RunState
+
+# Marks the end of the source iterable as it flows through the stages
+_END = object()
+
+#: Name used for the edges feeding source items into the root nodes
+SOURCE = "<source>"
+
+
+class _StreamItem:
+    """One source item flowing through the pipeline."""
+
+    def __init__(
+        self,
+        seq: int,
+        inputs: Any,
+        state: Optional[_RunState],
+        pending_sinks: int,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        self.seq = seq
+        self.inputs = inputs
+        self.state = state
+        self.pending_sinks = pending_sinks
+        self.error = error
+        # Guards the run state, which several stages update for this item
+        self.lock = threading.Lock()
+
+
+class _Pipeline:
+    """Stage threads, queues and stop state behind a :class:`GraphStream`.
+
+    Kept apart from the stream so the threads never reference it, which lets
+    an abandoned stream be collected and its finalizer stop them.
+    """
+
+    def __init__(
+        self,
+        graph: Graph,
+        source: Iterable[Any],
+        entry: Optional[str],
+        queue_size: int,
+        queue_sizes: Dict[str, int],
+        run_options: Tuple[bool, bool, Optional[Iterable[str]]],
+    ) -> None:
+        self._graph = graph
+        self._plan = graph._compile()
+        self._entry = entry
+        self._run_options = run_options
+
+        self.queues: Dict[str, "queue.Queue[Any]"] = {}
+        self._inputs: Dict[str, List[str]] = {name: [] for name in self._plan.order}
+        self._outputs: Dict[str, List[str]] = {name: [] for name in self._plan.order}
+        self._outputs[SOURCE] = []
+        for node_name in self._plan.order:
+            for dependency in self._plan.dependencies[node_name] or [SOURCE]:
+                edge = f"{dependency}->{node_name}"
+                self.queues[edge] = queue.Queue(
+                    maxsize=queue_sizes.get(edge, queue_size)
+                )
+                self._inputs[node_name].append(edge)
+                self._outputs[dependency].append(edge)
+        unknown = set(queue_sizes).difference(self.queues)
+        if unknown:
+            raise ValueError(f"Unknown queue edges: {sorted(unknown)}")
+
+        self.results: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.peak = {edge: 0 for edge in self.queues}
+        self._sinks = set(self._plan.sinks)
+        self._sinks_finished = 0
+        self._sinks_lock = threading.Lock()
+        self.source_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._exit_stack = ExitStack()
+        self.token = self._exit_stack.enter_context(graph._cancel_scope())
+
+        self._threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(iter(source),),
+                name="foton-source",
+                daemon=True,
+            )
+        ]
+        for node_name in self._plan.order:
+            self._threads.append(
+                threading.Thread(
+                    target=self._stage,
+                    args=(node_name,),
+                    name=f"foton-stage-{node_name}",
+                    daemon=True,
+                )
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def _put(self, edge: "queue.Queue[Any]", packet: Any) -> bool:
+        """Blocking put that gives up when the stream is closed."""
+        while not self._stop.is_set():
+            try:
+                edge.put(packet, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, edge: "queue.Queue[Any]") -> Any:
+        """Blocking get that returns None when the stream is closed."""
+        while not self._stop.is_set():
+            try:
+                return edge.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _send(self, edges: List[str], packet: Any) -> bool:
+        for edge in edges:
+            if not self._put(self.queues[edge], packet):
+                return False
+            # Each edge has a single producer, so this needs no lock
+            self.peak[edge] = max(self.peak[edge], self.queues[edge].qsize())
+        return True
+
+    def _feed(self, source: Iterator[Any]) -> None:
+        use_cache, free_intermediates, keep = self._run_options
+        seq = 0
+        try:
+            for inputs in source:
+                try:
+                    fork = self._graph._fork()
+                    bind_inputs(fork, inputs, self._entry)
+                    state = _RunState(
+                        fork,
+                        self._plan,
+                        use_cache,
+                        free_intermediates,
+                        keep,
+                        token=self.token,
+                    )
+                    item = _StreamItem(seq, inputs, state, len(self._sinks))
+                except Exception as e:
+                    item = _StreamItem(seq, inputs, None, len(self._sinks), error=e)
+                if not self._send(self._outputs[SOURCE], item):
+                    return
+                seq += 1
+        except Exception as e:
+            self.source_error = e
+        self._send(self._outputs[SOURCE], _END)
+
+    def _stage(self, node_name: str) -> None:
+        in_edges = [self.queues[edge] for edge in self._inputs[node_name]]
+        out_edges = self._outputs[node_name]
+        is_sink = node_name in self._sinks
+
+        while True:
+            packets = [self.get(edge) for edge in in_edges]
+            if any(packet is None for packet in packets):
+                return
+            item = packets[0]
+
+            if item is _END:
+                self._send(out_edges, _END)
+                if is_sink:
+                    with self._sinks_lock:
+                        self._sinks_finished += 1
+                        last = self._sinks_finished == len(self._sinks)
+                    if last:
+                        self._put(self.results, _END)
+                return
+
+            if item.error is None:
+                try:
+                    output = item.state.execute(node_name)
+                except Exception as e:
+                    item.error = e
+                else:
+                    with item.lock:
+                        item.state.complete(node_name, output)
+
+            if not self._send(out_edges, item):
+                return
+            if is_sink:
+                with item.lock:
+                    item.pending_sinks -= 1
+                    finished = item.pending_sinks == 0
+                if finished and not self._put(self.results, item):
+                    return
+
+    def close(self) -> None:
+        """Stop all stages and cancel the nodes that are still executing."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self.token.cancel("Stream closed")
+        self._exit_stack.close()
+
+
+class GraphStream:
+    """Iterator yielding an ExecutionResult per source item as it finishes.
+
+    Every node runs in its own stage thread and processes items in source
+    order. Stages are connected by one bounded queue per edge, so a stage
+    that gets ahead of its consumers blocks instead of piling up images in
+    memory: a fast ``Load`` waits while slow remote ``Edit`` nodes drain.
+    Each item runs on its own fork of the graph.
+
+    Results are yielded in source order. Use :meth:`queue_depths` and
+    :meth:`peak_queue_depths` to monitor backpressure, and :meth:`close` (or
+    a ``with`` block) to stop the pipeline early. Closing the stream, or
+    :meth:`Graph.cancel`, also cancels the nodes that are still executing. A
+    stream that is dropped without being closed is closed when collected.
+    """
+
+    def __init__(
+        self,
+        graph: Graph,
+        source: Iterable[Any],
+        entry: Optional[str] = None,
+        queue_size: int = 4,
+        queue_sizes: Optional[Dict[str, int]] = None,
+        on_error: str = "raise",
+        use_cache: bool = True,
+        free_intermediates: bool = False,
+        keep: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Start streaming ``source`` through ``graph``.
+
+        Args:
+            graph: Graph to run for every item
+            source: Items to process. Each item is either a mapping of
+                ``"node.port"`` to value or a single value bound to ``entry``
+            entry: Port that receives non-mapping items, e.g. ``"load.path"``
+            queue_size: Default capacity of every edge queue
+            queue_sizes: Per-edge capacities keyed by ``"source->target"``
+                (use ``"<source>->node"`` for the queues feeding root nodes)
+            on_error: ``"raise"`` stops the stream and raises the first item
+                error; ``"skip"`` drops failed items and carries on
+            use_cache: Reuse cached outputs of unchanged nodes
+            free_intermediates: Release intermediate outputs per item
+            keep: Nodes whose outputs survive ``free_intermediates``
+        """
+        if not graph.nodes:
+            raise ValueError("Cannot run empty graph")
+        if on_error not in ("raise", "skip"):
+            raise ValueError(f"Unknown on_error mode: {on_error}")
+
+        self._on_error = on_error
+        self._pipeline = _Pipeline(
+            graph,
+            source,
+            entry,
+            queue_size,
+            queue_sizes or {},
+            (use_cache, free_intermediates, keep),
+        )
+        self._finalizer = weakref.finalize(self, self._pipeline.close)
+
+    def __iter__(self) -> "GraphStream":
+        return self
+
+    def __next__(self) -> ExecutionResult:
+        while True:
+            item = self._pipeline.get(self._pipeline.results)
+            if item is None or item is _END:
+                self.close()
+                if item is _END and self._pipeline.source_error is not None:
+                    raise self._pipeline.source_error
+                raise StopIteration
+            if item.error is not None:
+                if self._on_error == "skip" and not self._pipeline.token.cancelled:
+                    continue
+                self.close()
+                raise item.error
+            state: _RunState = item.state
+            return state.result()
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Current number of items waiting on each edge (and for the caller)."""
+        pipeline = self._pipeline
+        depths = {edge: q.qsize() for edge, q in pipeline.queues.items()}
+        depths["results"] = pipeline.results.qsize()
+        return depths
+
+    def peak_queue_depths(self) -> Dict[str, int]:
+        """Highest depth observed on each edge since the stream started."""
+        return dict(self._pipeline.peak)
+
+    def close(self) -> None:
+        """Stop all stages and cancel the nodes that are still executing."""
+        self._finalizer()
+
+    def __enter__(self) -> "GraphStream":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,267 @@
+"""Pluggable tracing of graph runs, nodes and remote calls."""
+
+import hashlib
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Span:
+    """A unit of traced work.
+
+    The base class is the no-op span used when tracing is disabled; tracer
+    implementations subclass it.
+    """
+
+    def __init__(self, tracer: "Tracer") -> None:
+        self.tracer = tracer
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach ``key=value`` to the span."""
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        """Attach several attributes to the span."""
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Finish the span, marking it failed if ``error`` is given."""
+        pass
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar(
+    "foton_current_span", default=None
+)
+
+
+class Tracer:
+    """Opens spans for graph runs, node executions and remote calls.
+
+    The base class traces nothing and costs next to nothing. Pass an
+    :class:`InMemoryTracer`, an :class:`OpenTelemetryTracer` or your own
+    subclass (overriding :meth:`start_span`) to ``Graph(tracer=...)``.
+    """
+
+    #: Whether spans are recorded; the no-op tracer skips all bookkeeping
+    enabled = False
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None,
+    ) -> Span:
+        """Start a span; the caller must :meth:`Span.end` it."""
+        return Span(self)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None,
+    ) -> Iterator[Span]:
+        """Run the enclosed block in a span.
+
+        The span is the current span inside the block, so spans opened with
+        :func:`span` (e.g. by nodes) become its children. Exceptions mark the
+        span failed and are re-raised.
+
+        Args:
+            name: Span name, e.g. ``"foton.node"``
+            attributes: Initial attributes
+            parent: Parent span. Defaults to the current span.
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        if parent is None:
+            parent = _current_span.get()
+        current = self.start_span(name, attributes, parent)
+        reset = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.end(error=e)
+            raise
+        else:
+            current.end()
+        finally:
+            _current_span.reset(reset)
+
+
+_NOOP_SPAN = Span(Tracer())
+
+
+def current_span() -> Optional[Span]:
+    """Return the span the calling code runs in, if it is being traced."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """Open a child of the current span with the current span's tracer.
+
+    Nodes use this for their own spans (uploads, fal requests, downloads).
+    Outside a traced run it does nothing.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP_SPAN
+        return
+    with parent.tracer.span(name, attributes, parent=parent) as child:
+        yield child
+
+
+def hash_text(text: str) -> str:
+    """Short stable hash, for attributes that must not leak their content."""
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+@dataclass
+class RecordedSpan(Span):
+    """A span recorded by :class:`InMemoryTracer`."""
+
+    tracer: "InMemoryTracer" = field(repr=False)
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start: float = 0.0
+    end_time: Optional[float] = None
+    error: Optional[BaseException] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+        self.end_time = time.perf_counter()
+        self.tracer._finish(self)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds between start and end, once ended."""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start
+
+
+class InMemoryTracer(Tracer):
+    """Tracer that keeps finished spans in memory, for tests and debugging."""
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.spans: List[RecordedSpan] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None,
+    ) -> Span:
+        return RecordedSpan(
+            self,
+            name,
+            next(self._ids),
+            parent.span_id if isinstance(parent, RecordedSpan) else None,
+            dict(attributes or {}),
+            time.perf_counter(),
+        )
+
+    def _finish(self, recorded: RecordedSpan) -> None:
+        with self._lock:
+            self.spans.append(recorded)
+
+    def find(self, name: str) -> List[RecordedSpan]:
+        """Finished spans called ``name``, in the order they ended."""
+        with self._lock:
+            return [s for s in self.spans if s.name == name]
+
+    def children(self, parent: RecordedSpan) -> List[RecordedSpan]:
+        """Finished spans whose parent is ``parent``."""
+        with self._lock:
+            return [s for s in self.spans if s.parent_id == parent.span_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans = []
+
+
+def _otel_value(value: Any) -> Any:
+    """Coerce a value to a type OpenTelemetry accepts as an attribute."""
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)) and all(
+        isinstance(item, (str, bool, int, float)) for item in value
+    ):
+        return list(value)
+    return str(value)
+
+
+class _OpenTelemetrySpan(Span):
+    def __init__(self, tracer: "OpenTelemetryTracer", otel_span: Any) -> None:
+        super().__init__(tracer)
+        self.otel_span = otel_span
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.otel_span.set_attribute(key, _otel_value(value))
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            from opentelemetry.trace import Status, StatusCode
+
+            self.otel_span.record_exception(error)
+            self.otel_span.set_status(Status(StatusCode.ERROR, str(error)))
+        self.otel_span.end()
+
+
+class OpenTelemetryTracer(Tracer):
+    """Adapter emitting foton spans through OpenTelemetry.
+
+    Requires the ``opentelemetry-api`` package; exporting is configured as
+    usual through the OpenTelemetry SDK. A run started inside an active
+    OpenTelemetry span becomes its child.
+    """
+
+    enabled = True
+
+    def __init__(self, tracer: Any = None) -> None:
+        """Initialize the adapter.
+
+        Args:
+            tracer: OpenTelemetry tracer to use. Defaults to
+                ``opentelemetry.trace.get_tracer("foton")``.
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryTracer requires opentelemetry-api: "
+                "pip install opentelemetry-api"
+            ) from e
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer("foton")
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None,
+    ) -> Span:
+        context = None
+        if isinstance(parent, _OpenTelemetrySpan):
+            context = self._trace.set_span_in_context(parent.otel_span)
+        otel_span = self._tracer.start_span(name, context=context)
+        result = _OpenTelemetrySpan(self, otel_span)
+        result.set_attributes(attributes or {})
+        return result
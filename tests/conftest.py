@@ -0,0 +1,51 @@
+"""Shared fixtures: small test images and the fake fal backend."""
+
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pytest
+from PIL import Image as PILImage
+
+from benchmarks.fake_fal import FakeFalClient, FakeFalConfig, FakeFalServer, patched_fal
+
+
+def gradient(width: int = 48, height: int = 32) -> np.ndarray:
+    """An RGB image whose pixels all differ, so mix-ups show."""
+    x = np.linspace(0, 255, width, dtype=np.uint8)
+    y = np.linspace(0, 255, height, dtype=np.uint8)
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = x[None, :]
+    pixels[..., 1] = y[:, None]
+    pixels[..., 2] = 128
+    return pixels
+
+
+@pytest.fixture
+def pixels() -> np.ndarray:
+    return gradient()
+
+
+@pytest.fixture
+def png_path(tmp_path: Path) -> Path:
+    path = tmp_path / "input.png"
+    PILImage.fromarray(gradient()).save(path)
+    return path
+
+
+@pytest.fixture
+def jpeg_path(tmp_path: Path) -> Path:
+    path = tmp_path / "input.jpg"
+    PILImage.fromarray(gradient()).save(path, quality=90)
+    return path
+
+
+@pytest.fixture
+def fal_server(request: pytest.FixtureRequest) -> Iterator[FakeFalServer]:
+    """A fake fal backend the AI nodes talk to.
+
+    Parametrize indirectly with a FakeFalConfig to change its latency.
+    """
+    config = getattr(request, "param", None) or FakeFalConfig(image_size=(32, 32))
+    with FakeFalServer(config) as server, patched_fal(FakeFalClient(server)):
+        yield server
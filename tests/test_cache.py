@@ -0,0 +1,94 @@
+"""Unchanged nodes are reused; a parameter change re-executes downstream."""
+
+from pathlib import Path
+
+import numpy as np
+
+from foton import DiskCache, Graph
+from foton import nodes as N
+from foton.base import Node, NodeOutput
+
+
+def build(path: Path, **kwargs) -> Graph:
+    graph = Graph(**kwargs)
+    graph.add("load", N.Load(path=path))
+    graph.add("grade", N.ColorGrade(intensity=0.5))
+    graph.add("again", N.ColorGrade(intensity=0.5))
+    graph.wire("load.image -> grade.image")
+    graph.wire("grade.image -> again.image")
+    return graph
+
+
+def test_rerun_reuses_every_node(png_path):
+    graph = build(png_path)
+    first = graph.run()
+
+    second = graph.run()
+
+    assert first.cached == []
+    assert sorted(second.cached) == ["again", "grade", "load"]
+    np.testing.assert_array_equal(
+        second["again"]["image"].numpy, first["again"]["image"].numpy
+    )
+
+
+def test_param_change_misses_downstream_only(png_path):
+    graph = build(png_path)
+    first = graph.run()
+
+    graph.get_node("grade").intensity = 0.9
+    second = graph.run()
+
+    assert second.cached == ["load"]
+    assert first["grade"]["image"].metadata["intensity"] == 0.5
+    assert second["grade"]["image"].metadata["intensity"] == 0.9
+
+
+def test_use_cache_false_runs_everything(png_path):
+    graph = build(png_path)
+    graph.run()
+
+    assert graph.run(use_cache=False).cached == []
+
+
+def test_disk_cache_survives_new_graphs(png_path, tmp_path):
+    cache = DiskCache(tmp_path / "cache")
+    first = build(png_path, cache=cache).run()
+
+    second = build(png_path, cache=cache).run()
+    assert sorted(second.cached) == ["again", "grade", "load"]
+    np.testing.assert_array_equal(
+        second["again"]["image"].numpy, first["again"]["image"].numpy
+    )
+
+    changed = build(png_path, cache=cache)
+    changed.get_node("again").intensity = 0.1
+    assert sorted(changed.run().cached) == ["grade", "load"]
+
+
+def test_disk_cache_reindexes_orphaned_entries(png_path, tmp_path):
+    cache = DiskCache(tmp_path / "cache")
+    build(png_path, cache=cache).run()
+    with cache._connect() as db:
+        db.execute("DELETE FROM entries")
+
+    assert len(cache) == 0
+    assert sorted(build(png_path, cache=cache).run().cached) == [
+        "again",
+        "grade",
+        "load",
+    ]
+    assert len(cache) == 3
+
+
+def test_nodes_without_params_are_not_cached(png_path):
+    class Passthrough(Node):
+        def execute(self, **inputs):
+            return NodeOutput(data={"image": self.get_input("image")})
+
+    graph = build(png_path)
+    graph.add("plain", Passthrough())
+    graph.wire("again.image -> plain.image")
+    graph.run()
+
+    assert "plain" not in graph.run().cached
@@ -0,0 +1,80 @@
+"""Deadlines and cancellation stop remote work against the fake fal backend."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_fal import FakeFalConfig
+from foton import CancelToken, Graph, RunCancelled
+from foton import nodes as N
+
+# Requests that would take far longer than any test is willing to wait
+SLOW = FakeFalConfig(queue_latency=30, image_size=(32, 32))
+
+
+def build(path) -> Graph:
+    graph = Graph()
+    graph.add("load", N.Load(path=path))
+    graph.add("edit", N.Edit(prompt="make it blue", download_timeout=5))
+    graph.wire("load.image -> edit.image")
+    return graph
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_edit_runs_against_fake_fal(png_path, fal_server):
+    result = build(png_path).run()
+
+    assert result["edit"]["image"].size == (32, 32)
+    assert fal_server.counters["submitted"] == 1
+    assert fal_server.counters["uploads"] == 1
+
+
+@pytest.mark.parametrize("fal_server", [SLOW], indirect=True)
+@pytest.mark.parametrize("executor", ["sequential", "threads"])
+def test_deadline_cancels_queued_request(png_path, fal_server, executor):
+    started = time.monotonic()
+    with pytest.raises(RunCancelled):
+        build(png_path).run(executor=executor, timeout=0.3)
+
+    assert time.monotonic() - started < 5
+    assert fal_server.counters["submitted"] == 1
+    assert wait_for(lambda: fal_server.counters["cancelled"] == 1)
+
+
+@pytest.mark.parametrize("fal_server", [SLOW], indirect=True)
+def test_graph_cancel_from_another_thread(png_path, fal_server):
+    graph = build(png_path)
+    threading.Timer(0.3, graph.cancel).start()
+
+    with pytest.raises(RunCancelled):
+        graph.run(executor="threads")
+    assert wait_for(lambda: fal_server.counters["cancelled"] == 1)
+
+
+@pytest.mark.parametrize("fal_server", [SLOW], indirect=True)
+def test_caller_token_cancels_arun(png_path, fal_server):
+    token = CancelToken()
+    threading.Timer(0.3, token.cancel).start()
+
+    with pytest.raises(RunCancelled):
+        asyncio.run(build(png_path).arun(cancel_token=token))
+    assert wait_for(lambda: fal_server.counters["cancelled"] == 1)
+
+
+def test_cancelled_token_starts_nothing(png_path, fal_server):
+    token = CancelToken()
+    token.cancel()
+
+    with pytest.raises(RunCancelled):
+        build(png_path).run(cancel_token=token)
+    assert fal_server.counters["submitted"] == 0
@@ -0,0 +1,69 @@
+"""Every executor produces the same outputs; targets run only what they need."""
+
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from foton import Graph
+from foton import nodes as N
+
+
+def build(path: Path) -> Graph:
+    graph = Graph()
+    graph.add("load", N.Load(path=path))
+    graph.add("warm", N.ColorGrade(intensity=0.4))
+    graph.add("strong", N.ColorGrade(intensity=0.9))
+    graph.add("both", N.ColorGrade(intensity=0.7))
+    graph.wire("load.image -> warm.image")
+    graph.wire("load.image -> strong.image")
+    graph.wire("warm.image -> both.image")
+    return graph
+
+
+def pixels(result, node: str) -> np.ndarray:
+    return result[node]["image"].numpy
+
+
+@pytest.mark.parametrize(
+    "run",
+    [
+        lambda graph: graph.run(executor="threads", max_workers=4),
+        lambda graph: graph.run(executor="threads", schedule="critical_path"),
+        lambda graph: asyncio.run(graph.arun()),
+    ],
+    ids=["threads", "critical_path", "arun"],
+)
+def test_executors_match_sequential(png_path, run):
+    expected = build(png_path).run()
+    result = run(build(png_path))
+
+    assert set(result.outputs) == set(expected.outputs)
+    for node in ("warm", "strong", "both"):
+        np.testing.assert_array_equal(pixels(result, node), pixels(expected, node))
+
+
+def test_process_pool_matches_sequential(png_path):
+    expected = build(png_path).run()
+    result = build(png_path).run(executor="threads", max_processes=2)
+
+    for node in ("warm", "strong", "both"):
+        np.testing.assert_array_equal(pixels(result, node), pixels(expected, node))
+
+
+def test_targets_run_only_the_subplan(png_path):
+    graph = build(png_path)
+
+    result = graph.run(targets=["both.image"])
+
+    assert result.execution_order == ["load", "warm", "both"]
+    assert "strong" not in result.outputs
+    np.testing.assert_array_equal(
+        pixels(result, "both"), pixels(build(png_path).run(), "both")
+    )
+
+
+def test_targets_reject_unknown_nodes(png_path):
+    with pytest.raises(ValueError):
+        build(png_path).run(targets=["missing.image"])
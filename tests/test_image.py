@@ -0,0 +1,113 @@
+"""Encoded-bytes passthrough, invalidation on mutation and memmap saves."""
+
+import numpy as np
+import pytest
+from PIL import Image as PILImage
+
+from foton import Graph, Image
+from foton import nodes as N
+
+
+def test_save_passes_original_bytes_through(jpeg_path, tmp_path):
+    image = Image(jpeg_path)
+    out = tmp_path / "out.jpg"
+
+    image.numpy  # reading pixels keeps the encoding
+    image.save(out)
+
+    assert image.encoded_format == "JPEG"
+    assert out.read_bytes() == jpeg_path.read_bytes()
+
+
+def test_load_export_never_reencodes(jpeg_path, tmp_path):
+    out = tmp_path / "out.jpg"
+    graph = Graph()
+    graph.add("load", N.Load(path=jpeg_path))
+    graph.add("export", N.Export(path=out))
+    graph.wire("load.image -> export.image")
+
+    graph.run()
+
+    assert out.read_bytes() == jpeg_path.read_bytes()
+
+
+def test_other_format_is_reencoded(jpeg_path, tmp_path):
+    out = tmp_path / "out.png"
+
+    Image(jpeg_path).save(out)
+
+    with PILImage.open(out) as saved:
+        assert saved.format == "PNG"
+
+
+def test_pil_access_drops_the_encoding(png_path, tmp_path):
+    image = Image(png_path)
+    out = tmp_path / "out.png"
+
+    pil = image.pil
+    pil.putpixel((0, 0), (1, 2, 3))
+    image.save(out)
+
+    assert image.encoded_format is None
+    assert image.encoded_bytes() is None
+    with PILImage.open(out) as saved:
+        assert saved.getpixel((0, 0)) == (1, 2, 3)
+
+
+def test_invalidate_after_in_place_edit(png_path, tmp_path):
+    image = Image(png_path)
+    image.numpy
+    image.pil.putpixel((0, 0), (1, 2, 3))
+    image.invalidate()
+
+    assert tuple(image.numpy[0, 0]) == (1, 2, 3)
+
+
+def test_array_images_copy_caller_arrays(pixels):
+    image = Image(pixels)
+
+    pixels[0, 0] = 7
+
+    assert tuple(image.numpy[0, 0]) != (7, 7, 7)
+    assert not image.numpy.flags.writeable
+
+
+def test_memmap_save_over_itself_npy(tmp_path, pixels):
+    path = tmp_path / "frame.npy"
+    np.save(path, pixels)
+    image = Image.open_memmap(path)
+
+    image.save(path)
+
+    assert image.is_memmap
+    np.testing.assert_array_equal(np.load(path), pixels)
+    np.testing.assert_array_equal(image.numpy, pixels)
+
+
+def test_memmap_save_over_itself_ppm(tmp_path, pixels):
+    path = tmp_path / "frame.ppm"
+    PILImage.fromarray(pixels).save(path)
+    image = Image.open_memmap(path)
+
+    image.save(path)
+
+    with PILImage.open(path) as saved:
+        np.testing.assert_array_equal(np.asarray(saved), pixels)
+
+
+def test_memmap_graph_export_over_input(tmp_path, pixels):
+    path = tmp_path / "frame.npy"
+    np.save(path, pixels)
+    graph = Graph()
+    graph.add("load", N.Load(path=path, mmap=True))
+    graph.add("export", N.Export(path=path))
+    graph.wire("load.image -> export.image")
+
+    graph.run()
+
+    np.testing.assert_array_equal(np.load(path), pixels)
+
+
+def test_memmap_rejects_unsupported_files(png_path):
+    with pytest.raises(ValueError):
+        Image.open_memmap(png_path)
@@ -0,0 +1,134 @@
+"""Retries, attempt timeouts and hedged attempts."""
+
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from benchmarks.fake_fal import FakeFalConfig
+from foton import Graph, Policy
+from foton import nodes as N
+from foton.base import Node, NodeOutput
+from foton.cancel import current_token
+
+
+class Flaky(Node):
+    """Fails until it has been called ``failures`` times."""
+
+    calls = itertools.count()
+
+    def __init__(self, failures: int, error: type = ConnectionError) -> None:
+        super().__init__()
+        self.failures = failures
+        self.error = error
+
+    def execute(self, **inputs):
+        call = next(self.calls)
+        if call < self.failures:
+            raise self.error(f"flake {call}")
+        return NodeOutput(data={"call": call})
+
+
+class SlowFirst(Node):
+    """The first attempt hangs (until cancelled); later ones return at once."""
+
+    calls = itertools.count()
+
+    def execute(self, **inputs):
+        call = next(self.calls)
+        if call == 0:
+            token = current_token()
+            assert token is not None
+            token.wait(10)
+            token.raise_if_cancelled()
+        return NodeOutput(data={"call": call})
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    Flaky.calls = itertools.count()
+    SlowFirst.calls = itertools.count()
+
+
+def single(node: Node, policy: Policy) -> Graph:
+    return Graph().add("node", node, policy=policy)
+
+
+def test_retries_until_success():
+    graph = single(Flaky(failures=2), Policy(max_attempts=3, backoff=0))
+
+    assert graph.run()["node"]["call"] == 2
+
+
+def test_retries_are_exhausted():
+    graph = single(Flaky(failures=5), Policy(max_attempts=2, backoff=0))
+
+    with pytest.raises(RuntimeError, match="flake 1"):
+        graph.run()
+
+
+def test_only_retry_on_is_retried():
+    policy = Policy(max_attempts=3, backoff=0, retry_on=(ConnectionError,))
+    graph = single(Flaky(failures=1, error=KeyError), policy)
+
+    with pytest.raises(RuntimeError, match="flake 0"):
+        graph.run()
+    assert next(Flaky.calls) == 1
+
+
+def test_async_retries():
+    graph = single(Flaky(failures=2), Policy(max_attempts=3, backoff=0))
+
+    assert asyncio.run(graph.arun())["node"]["call"] == 2
+
+
+def test_attempt_timeout_retries_stuck_attempt():
+    graph = single(SlowFirst(), Policy(max_attempts=2, backoff=0, attempt_timeout=0.2))
+
+    started = time.monotonic()
+    assert graph.run()["node"]["call"] == 1
+    assert time.monotonic() - started < 2
+
+
+def test_hedge_takes_the_faster_attempt():
+    graph = single(SlowFirst(), Policy(hedge_after=0.1))
+
+    started = time.monotonic()
+    assert graph.run()["node"]["call"] == 1
+    assert time.monotonic() - started < 2
+
+
+def test_hedge_latencies_are_per_node():
+    policy = Policy(hedge_quantile=0.5, hedge_min_samples=1)
+    graph = Graph()
+    graph.add("a", Flaky(failures=0), policy=policy)
+    graph.add("b", Flaky(failures=0), policy=policy)
+
+    graph.run()
+
+    assert sorted(graph._latencies) == ["a", "b"]
+    assert [len(graph._latencies[name]) for name in "ab"] == [1, 1]
+
+
+@pytest.mark.parametrize(
+    "fal_server",
+    [FakeFalConfig(queue_latency=0.5, image_size=(32, 32))],
+    indirect=True,
+)
+def test_hedged_edit_cancels_the_loser(png_path, fal_server):
+    graph = Graph()
+    graph.add("load", N.Load(path=png_path))
+    graph.add(
+        "edit",
+        N.Edit(prompt="make it blue", download_timeout=5),
+        policy=Policy(hedge_after=0.05),
+    )
+    graph.wire("load.image -> edit.image")
+
+    assert graph.run()["edit"]["image"].size == (32, 32)
+    assert fal_server.counters["submitted"] == 2
+    deadline = time.monotonic() + 5
+    while fal_server.counters["cancelled"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fal_server.counters["cancelled"] == 1
@@ -0,0 +1,83 @@
+"""Graphs survive a round trip through their spec."""
+
+import json
+
+import numpy as np
+import pytest
+
+from foton import Graph, Policy
+from foton import nodes as N
+from foton import register_node
+from foton.base import Node, NodeOutput
+from foton.spec import save_spec
+
+
+@register_node(name="tests.Constant")
+class Constant(Node):
+    def __init__(self, value: int = 0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.value = value
+
+    def spec_params(self):
+        return {**super().spec_params(), "value": self.value}
+
+    def execute(self, **inputs):
+        return NodeOutput(data={"value": self.value})
+
+
+def build(png_path, out_path) -> Graph:
+    graph = Graph()
+    graph.add("load", N.Load(path=png_path))
+    graph.add(
+        "grade",
+        N.ColorGrade(intensity=0.6),
+        policy=Policy(max_attempts=3, backoff=0.1, retry_on=(OSError,)),
+    )
+    graph.add("export", N.Export(path=out_path))
+    graph.wire("load.image -> grade.image")
+    graph.wire("grade.image -> export.image")
+    return graph
+
+
+def test_spec_round_trip(png_path, tmp_path):
+    graph = build(png_path, tmp_path / "out.png")
+    spec = graph.to_spec()
+
+    rebuilt = Graph.from_spec(json.loads(json.dumps(spec)))
+
+    assert rebuilt.to_spec() == spec
+    assert rebuilt.list_nodes() == graph.list_nodes()
+    assert rebuilt.get_node("grade").policy == graph.get_node("grade").policy
+    assert rebuilt.get_node("grade").intensity == 0.6
+    np.testing.assert_array_equal(
+        rebuilt.run()["grade"]["image"].numpy, graph.run()["grade"]["image"].numpy
+    )
+
+
+@pytest.mark.parametrize("suffix", [".json", ".yaml"])
+def test_spec_file_round_trip(png_path, tmp_path, suffix):
+    if suffix == ".yaml":
+        pytest.importorskip("yaml")
+    spec = build(png_path, tmp_path / "out.png").to_spec()
+    path = tmp_path / f"graph{suffix}"
+
+    save_spec(spec, path)
+
+    assert Graph.from_spec(path).to_spec() == spec
+
+
+def test_registered_custom_node():
+    graph = Graph().add("constant", Constant(value=7))
+    spec = graph.to_spec()
+
+    rebuilt = Graph.from_spec(spec)
+
+    assert spec["nodes"]["constant"]["type"] == "tests.Constant"
+    assert rebuilt.run()["constant"]["value"] == 7
+
+
+def test_unknown_node_type_is_rejected():
+    spec = {"version": 1, "nodes": {"x": {"type": "Nope"}}, "wires": []}
+
+    with pytest.raises(ValueError, match="Unknown node type"):
+        Graph.from_spec(spec)